@@ -1,29 +1,66 @@
+"""
+Manga downloader. Run it for the interactive prompt or the job queue and worker commands (see --help), or import it:
+download_manga, update_manga, update_folders and download_chapter return what they did as dicts, and the browser,
+progress bar and imaging libraries are only loaded once something needs them.
+"""
 import os
-from unittest import skip
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from bs4 import BeautifulSoup, SoupStrainer
 import re
+import asyncio
 from io import BytesIO
-from zipfile import ZipFile
-from tqdm import tqdm
+from zipfile import ZipFile, ZIP_STORED, ZIP_DEFLATED
 from datetime import datetime
-from urllib.parse import urljoin, quote_plus
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import WebDriverException, TimeoutException
-import webbrowser
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, FIRST_COMPLETED, wait, as_completed
+from urllib.parse import urljoin, urlparse
 import time
 import stat
-import random
-from PIL import Image, UnidentifiedImageError
+import shutil
+import threading
+import contextvars
+import sqlite3
+import hashlib
+import zlib
+import json
+from collections import deque
+import atexit
+from contextlib import contextmanager
 import logging
-import pyautogui
+import argparse
+import socket
+import sys
+import uuid
+
+# BeautifulSoup uses the C-backed lxml parser when it is installed, and the pure Python one otherwise
+try:
+    import lxml  # noqa: F401
+    html_parser = "lxml"
+except ImportError:
+    html_parser = "html.parser"
+
+# The browser backend (selenium and webdriver_manager) is imported by load_browser_backend the first time a browser
+# is needed, and tqdm and PIL where they are used, so importing this module or running over plain HTTP loads none of them
+webdriver = By = Service = Options = ChromeDriverManager = WebDriverWait = EC = None
+StaleElementReferenceException = TimeoutException = WebDriverException = None
+browser_backend_lock = threading.Lock()
+
+def load_browser_backend():
+    """Import selenium and webdriver_manager into this module's namespace, once."""
+    global webdriver, By, Service, Options, ChromeDriverManager, WebDriverWait, EC
+    global StaleElementReferenceException, TimeoutException, WebDriverException
+    with browser_backend_lock:
+        if webdriver is not None:
+            return
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        from webdriver_manager.chrome import ChromeDriverManager
+        from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium import webdriver
 
 
 # Base directory for manga storage
@@ -34,58 +71,997 @@ headers = {
     "Referer": "",
 }
 
+# Connection pools of the shared HTTP transport: number of hosts kept, and the most connections open
+# to one host at a time (requests wait for a free connection beyond that)
+pool_connections = 10
+pool_maxsize = 16
+
+# Requests per second and burst size allowed per host by the transport's token buckets (None for no limit).
+# host_rate_* paces the series, chapter and API pages; image_rate_* paces the page and cover images, which
+# image_workers fetch in parallel from the image CDNs and are unlimited by default
+host_rate_limit = 5.0
+host_rate_burst = 10
+image_rate_limit = None
+image_rate_burst = 20
+# Per-host overrides of the limits above, e.g. {"chapmanganato.to": {"rate": 2.0, "burst": 4, "connections": 4}}
+# ("image_rate" and "image_burst" override the image limits)
+host_limits = {}
+
+# Seconds a request may wait for the server to answer or to send more data, and the most a single page
+# download may take in total before it is abandoned
+request_timeout = 10
+page_timeout = 120
+
+# Hedged page requests: a page still unfinished after the hedge_percentile of its host's recent page times gets a
+# duplicate request (to the other image server when its list is known); the first complete copy wins and the
+# other request is cancelled. hedge_budget caps the duplicates at that share of all page requests.
+hedge_requests = False
+hedge_percentile = 0.95
+hedge_budget = 0.1
+# Recent page times kept per host, how many a host needs before its pages are hedged, and the shortest hedging delay
+hedge_window = 200
+hedge_min_samples = 20
+hedge_min_delay = 0.25
+
+# Number of series refreshed at the same time by the update scheduler
+series_workers = 4
+
+# Updates stop reading the newest-first chapter list after this many already downloaded chapters in a row,
+# and walk the whole list again once the last full scan of the series is older than full_scan_interval_days
+known_chapter_run = 5
+full_scan_interval_days = 7
+
+# Number of long-lived Chrome instances kept warm by the browser pool, and whether they run headless
+browser_pool_size = 2
+browser_headless = True
+# A site host whose chapter pages needed the browser keeps using it, but plain HTTP is tried again
+# every this many chapters
+manifest_http_retry_chapters = 10
+
+# Browser pages are waited on by condition (document ready, elements present), never longer than
+# browser_wait_timeout seconds
+browser_wait_timeout = 10
+
+# Number of pages fetched at the same time within a single chapter
+image_workers = 8
+
+# Format of the pages written into CBZ files: "original" keeps the downloaded bytes, "jpeg" or "webp" opt into
+# re-encoding every page that is not in that format already (lossy: PNG pages lose quality as JPEG)
+transcode_policy = "original"
+transcode_quality = 90
+# Worker processes that re-encode pages, so encoding never blocks the download threads
+transcode_workers = os.cpu_count() or 1
+
+# Chapter download engine: "sequential" finishes one chapter before starting the next,
+# "pipeline" overlaps chapter page fetch, parsing, image fetch and CBZ packing across chapters
+download_engine = "sequential"
+# Maximum number of chapters buffered between two pipeline stages
+pipeline_queue_size = 2
+
+# Series and chapter pages are cached in page_cache.db: a page younger than page_cache_ttl seconds is
+# used without any request, an older one is revalidated with ETag/Last-Modified
+page_cache_ttl = 10 * 60
+# Compressed bytes kept in the page cache before the least recently used pages are evicted
+page_cache_max_bytes = 64 * 1024 * 1024
+
+# MangaDex endpoints used to look covers up over plain HTTP (point them at a local stand-in for testing)
+mangadex_api_url = "https://api.mangadex.org"
+mangadex_covers_url = "https://uploads.mangadex.org/covers"
+# Days before a title that had no cover on MangaDex is looked up again
+cover_negative_ttl_days = 30
+
+# Downloaded page images kept in page_store.db, stored once per content hash, before the least recently used are evicted
+page_store_max_bytes = 512 * 1024 * 1024
+
+# Per-stage timings and counters of each run are saved to metrics_dir (None means base_dir): one JSON summary
+# per run appended to run_metrics.jsonl, and manga_downloader.prom for the node exporter's textfile collector
+metrics_dir = None
+# Upper bounds in seconds of the stage latency histogram buckets
+metrics_buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Image mirrors (the reader's image servers and the CDN hosts behind them) get rolling latency and failure scores,
+# kept in library.db across runs; mirror_score_weight is how much the newest page moves a score
+mirror_score_weight = 0.3
+# A mirror failing at least this share of its pages, over at least mirror_min_samples pages, is tried last
+# until it has gone mirror_retry_after seconds unused
+mirror_failure_threshold = 0.5
+mirror_min_samples = 20
+mirror_retry_after = 10 * 60
+
+# Worker mode takes series, update and chapter jobs from job_queue.db in base_dir. A running job holds a lease of
+# job_lease_seconds that its worker keeps renewing; if the worker dies, the job is run again once the lease expires.
+# A failing job is retried after job_retry_delay seconds until it has been tried job_max_attempts times.
+job_lease_seconds = 5 * 60
+job_max_attempts = 3
+job_retry_delay = 60
+# Seconds an idle worker waits before looking at the queue again
+worker_poll_interval = 5
+
+def host_limit(host, name, default):
+    return host_limits.get(host, {}).get(name, default)
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    def __init__(self, host, *args, **kwargs):
+        # Blocking pools turn maxsize into a hard cap on parallel connections to the host
+        kwargs["maxsize"] = host_limit(host, "connections", pool_maxsize)
+        kwargs["block"] = True
+        super().__init__(host, *args, **kwargs)
+
+    def _new_conn(self):
+        http_transport_stats.record_connection(self.host)
+        return super()._new_conn()
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def __init__(self, host, *args, **kwargs):
+        kwargs["maxsize"] = host_limit(host, "connections", pool_maxsize)
+        kwargs["block"] = True
+        super().__init__(host, *args, **kwargs)
+
+    def _new_conn(self):
+        http_transport_stats.record_connection(self.host)
+        return super()._new_conn()
+
+class TokenBucket:
+    """Token bucket rate limiter: acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate, burst):
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+class TransportStats:
+    """Request and new-connection counters per host for the shared HTTP transport."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.connections = {}
+
+    def record_request(self, host):
+        with self.lock:
+            self.requests[host] = self.requests.get(host, 0) + 1
+
+    def record_connection(self, host):
+        with self.lock:
+            self.connections[host] = self.connections.get(host, 0) + 1
+
+    def summary(self):
+        with self.lock:
+            total_requests = sum(self.requests.values())
+            total_connections = sum(self.connections.values())
+        return {
+            "requests": total_requests,
+            "connections": total_connections,
+            "reused": max(total_requests - total_connections, 0),
+        }
+
+http_transport_stats = TransportStats()
+
+# Series the current download or update belongs to, used to label the run metrics
+current_series = contextvars.ContextVar("current_series", default=None)
+
+metric_descriptions = {
+    "bytes_downloaded": "Image bytes downloaded.",
+    "pages_failed": "Pages that could not be downloaded.",
+    "retries": "Downloads attempted again after a failure.",
+    "fallbacks": "Chapters handed to the fallback download path.",
+    "server_switches": "Switches to another image server in the browser.",
+    "hedges": "Duplicate requests sent for slow pages.",
+    "hedges_won": "Duplicate requests that finished before the original.",
+}
+
+def prometheus_labels(**labels):
+    escaped = {name: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for name, value in labels.items()}
+    return ",".join(f'{name}="{value}"' for name, value in escaped.items())
+
+class RunMetrics:
+    """
+    Latency histograms per stage and event counters for the current run, labelled by host and series.
+    Stages: series_page, chapter_page, image, transcode, cbz_write, browser_start and cover.
+    In worker mode each job gets its own RunMetrics, and job holds the job's id, kind and target.
+    """
+
+    def __init__(self, job=None):
+        self.lock = threading.Lock()
+        self.job = job
+        self.started = time.time()
+        self.histograms = {}  # (stage, host, series) -> cumulative bucket counts, count and sum
+        self.counters = {}  # (name, host, series) -> value
+
+    def labels(self, url, series):
+        host = urlparse(url).hostname if url else None
+        return host or "", series or current_series.get() or ""
+
+    def observe(self, stage, seconds, url=None, series=None):
+        key = (stage, *self.labels(url, series))
+        with self.lock:
+            histogram = self.histograms.setdefault(key, {"buckets": [0] * len(metrics_buckets), "count": 0, "sum": 0.0})
+            for index, bound in enumerate(metrics_buckets):
+                if seconds <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+
+    def count(self, name, amount=1, url=None, series=None):
+        key = (name, *self.labels(url, series))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def stage(self, stage, url=None):
+        """Time the enclosed block as one observation of stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, url)
+
+    def summary(self):
+        """Totals per stage and counter, overall and broken down by host and by series."""
+        def add(entry, group, label, count, seconds=None):
+            if label:
+                totals = entry[group].setdefault(label, {"count": 0} if seconds is None else {"count": 0, "seconds": 0.0})
+                totals["count"] += count
+                if seconds is not None:
+                    totals["seconds"] += seconds
+
+        stages = {}
+        counters = {}
+        with self.lock:
+            for (stage, host, series), histogram in sorted(self.histograms.items()):
+                entry = stages.setdefault(stage, {"count": 0, "seconds": 0.0, "buckets": {str(bound): 0 for bound in metrics_buckets},
+                                                  "by_host": {}, "by_series": {}})
+                entry["count"] += histogram["count"]
+                entry["seconds"] += histogram["sum"]
+                for bound, bucket_count in zip(metrics_buckets, histogram["buckets"]):
+                    entry["buckets"][str(bound)] += bucket_count
+                add(entry, "by_host", host, histogram["count"], histogram["sum"])
+                add(entry, "by_series", series, histogram["count"], histogram["sum"])
+            for (name, host, series), value in sorted(self.counters.items()):
+                entry = counters.setdefault(name, {"count": 0, "by_host": {}, "by_series": {}})
+                entry["count"] += value
+                add(entry, "by_host", host, value)
+                add(entry, "by_series", series, value)
+
+        summary = {
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "duration_seconds": round(time.time() - self.started, 3),
+            "stages": stages,
+            "counters": counters,
+        }
+        if self.job:
+            summary["job"] = self.job
+        return summary
+
+    def prometheus_text(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = ["# HELP manga_downloader_stage_seconds Time spent in each download stage.",
+                 "# TYPE manga_downloader_stage_seconds histogram"]
+        with self.lock:
+            for (stage, host, series), histogram in sorted(self.histograms.items()):
+                labels = prometheus_labels(stage=stage, host=host, series=series)
+                for bound, bucket_count in zip(metrics_buckets, histogram["buckets"]):
+                    lines.append(f'manga_downloader_stage_seconds_bucket{{{labels},le="{bound}"}} {bucket_count}')
+                lines.append(f'manga_downloader_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+                lines.append(f"manga_downloader_stage_seconds_sum{{{labels}}} {histogram['sum']:.6f}")
+                lines.append(f"manga_downloader_stage_seconds_count{{{labels}}} {histogram['count']}")
+
+            for name in sorted({key[0] for key in self.counters}):
+                lines.append(f"# HELP manga_downloader_{name}_total {metric_descriptions.get(name, name)}")
+                lines.append(f"# TYPE manga_downloader_{name}_total counter")
+                for (counter, host, series), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"manga_downloader_{name}_total{{{prometheus_labels(host=host, series=series)}}} {value}")
+
+        lines += ["# HELP manga_downloader_last_run_timestamp_seconds When the last run started.",
+                  "# TYPE manga_downloader_last_run_timestamp_seconds gauge",
+                  f"manga_downloader_last_run_timestamp_seconds {self.started:.0f}",
+                  "# HELP manga_downloader_last_run_duration_seconds How long the last run took.",
+                  "# TYPE manga_downloader_last_run_duration_seconds gauge",
+                  f"manga_downloader_last_run_duration_seconds {time.time() - self.started:.3f}"]
+        return "\n".join(lines) + "\n"
+
+run_metrics = RunMetrics()
+
+def save_run_metrics():
+    """
+    Append this run's summary to run_metrics.jsonl and rewrite manga_downloader.prom in metrics_dir.
+    The text file is replaced atomically so the node exporter never reads half of it. Returns the directory.
+    """
+    directory = metrics_dir or base_dir
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "run_metrics.jsonl"), "a", encoding="utf-8") as metrics_file:
+        metrics_file.write(json.dumps(run_metrics.summary()) + "\n")
+
+    textfile_path = os.path.join(directory, "manga_downloader.prom")
+    with open(textfile_path + ".tmp", "w", encoding="utf-8") as textfile:
+        textfile.write(run_metrics.prometheus_text())
+    os.replace(textfile_path + ".tmp", textfile_path)
+    return directory
+
+# Referer sent with the requests of the current series; a context variable so parallel series don't overwrite each other
+current_referer = contextvars.ContextVar("current_referer", default=None)
+
+class HttpTransport:
+    """
+    Shared keep-alive HTTP transport used for every request the downloader makes.
+    Keeps one connection pool per host, so repeated requests to the same image CDN reuse connections,
+    and paces the requests to each host with a token bucket.
+    """
+
+    def __init__(self, pool_connections=pool_connections, pool_maxsize=pool_maxsize):
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.adapter.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self.buckets_lock = threading.Lock()
+        self.buckets = {}
+
+    def set_referer(self, url):
+        current_referer.set(url)
+
+    def bucket(self, host, kind="page"):
+        with self.buckets_lock:
+            if (host, kind) not in self.buckets:
+                if kind == "image":
+                    rate = host_limit(host, "image_rate", image_rate_limit)
+                    burst = host_limit(host, "image_burst", image_rate_burst)
+                else:
+                    rate = host_limit(host, "rate", host_rate_limit)
+                    burst = host_limit(host, "burst", host_rate_burst)
+                self.buckets[host, kind] = TokenBucket(rate, burst) if rate else None
+            return self.buckets[host, kind]
+
+    def request(self, method, url, kind="page", **kwargs):
+        """Send a request through the host's token bucket for its kind: "page" (HTML and API) or "image"."""
+        host = urlparse(url).hostname
+        bucket = self.bucket(host, kind)
+        if bucket is not None:
+            bucket.acquire()
+
+        referer = current_referer.get()
+        if referer:
+            kwargs["headers"] = {"Referer": referer, **(kwargs.get("headers") or {})}
+
+        kwargs.setdefault("timeout", request_timeout)
+        http_transport_stats.record_request(host)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+http_transport = None
+
+def get_transport():
+    """Return the shared HTTP transport, creating it on first use."""
+    global http_transport
+    if http_transport is None:
+        http_transport = HttpTransport()
+    return http_transport
+
+def set_referer(url):
+    get_transport().set_referer(url)
+
+def print_transport_stats():
+    stats = http_transport_stats.summary()
+    print(f"HTTP requests: {stats['requests']}, new connections: {stats['connections']}, "
+          f"reused connections: {stats['reused']}")
+    if page_cache is not None:
+        cache_stats = page_cache.stats
+        print(f"Page cache: {cache_stats['fresh']} fresh, {cache_stats['not_modified']} not modified, "
+              f"{cache_stats['fetched']} fetched")
+    if page_store is not None:
+        store_stats = page_store.stats
+        print(f"Page store: {store_stats['url_hits']} pages reused ({store_stats['bytes_not_downloaded'] / (1024 * 1024):.2f} MB "
+              f"not downloaded), {store_stats['duplicates']} duplicate pages "
+              f"({store_stats['bytes_deduplicated'] / (1024 * 1024):.2f} MB stored once)")
+    if hedge_policy.hedges:
+        print(f"Hedged requests: {hedge_policy.hedges} duplicates sent for {hedge_policy.pages} pages, "
+              f"{hedge_policy.wins} finished first")
+    stages = run_metrics.summary()["stages"]
+    if stages:
+        print("Stage times: " + ", ".join(f"{stage} {entry['seconds']:.1f}s/{entry['count']}" for stage, entry in stages.items()))
+
 def sanitize_filename(filename):
     return re.sub(r'[<>:"/\\|?*]', '', filename)
 
-def clean_title_for_search(title):
-    return re.sub(r"[^\w\s]", "", title).strip().replace(" ", "+")
-
 def log_error(manga_dir, error_message):
     error_log_path = os.path.join(manga_dir, "error_log.txt")
     with open(error_log_path, "a", encoding="utf-8") as log_file:
         log_file.write(f"{datetime.now().isoformat()} - {error_message}\n")
     print(f"Error logged to {error_log_path}")
 
-def save_html_as_txt(manga_dir, html_content):
+def save_html_as_txt(manga_dir, html_content, changed=True):
+    """Write page_content.txt, unless the page is unchanged since the last run and the file is already there."""
     html_file_path = os.path.join(manga_dir, "page_content.txt")
+    if not changed and os.path.exists(html_file_path):
+        return html_file_path
     with open(html_file_path, "w", encoding="utf-8") as html_file:
         html_file.write(html_content)
     return html_file_path
 
-def extract_alternative_titles_from_file(manga_dir):
+def save_series_metadata(manga_dir, url, series, changed=True):
+    """
+    Write the metadata extracted from the series page to metadata.json next to url.txt, so later steps
+    (covers, alternative titles) never have to parse the page again. Skipped when the page is unchanged.
+    """
+    metadata_path = os.path.join(manga_dir, "metadata.json")
+    if not changed and os.path.exists(metadata_path):
+        return metadata_path
+
+    metadata = {
+        "url": url,
+        "title": series["title"],
+        "alternative_titles": series["alternative_titles"],
+        "cover_url": urljoin(url, series["cover_url"]) if series["cover_url"] else None,
+        "chapter_count": len(series["chapters"]),
+        "updated_at": datetime.now().isoformat(),
+    }
+    with open(metadata_path + ".tmp", "w", encoding="utf-8") as metadata_file:
+        json.dump(metadata, metadata_file, ensure_ascii=False, indent=2)
+    os.replace(metadata_path + ".tmp", metadata_path)
+    return metadata_path
+
+def load_series_metadata(manga_dir):
+    """
+    The series' metadata.json, or for folders from before it existed, the same metadata extracted
+    from page_content.txt. Returns None if neither is there.
+    """
+    metadata_path = os.path.join(manga_dir, "metadata.json")
+    if os.path.exists(metadata_path):
+        with open(metadata_path, "r", encoding="utf-8") as metadata_file:
+            return json.load(metadata_file)
+
     page_content_path = os.path.join(manga_dir, "page_content.txt")
-    
     if not os.path.exists(page_content_path):
-        print(f"page_content.txt not found in {manga_dir}")
-        return []
-
-    # Read the content of the page_content.txt file
+        return None
     with open(page_content_path, 'r', encoding='utf-8') as file:
-        html_content = file.read()
+        return parse_series_page(file.read())
 
-    # Parse the HTML to extract alternative titles
-    soup = BeautifulSoup(html_content, 'html.parser')
-    alternative_titles_tag = soup.find('td', class_='table-label')
-    
-    if alternative_titles_tag and 'Alternative' in alternative_titles_tag.text:
-        alternative_titles_value = alternative_titles_tag.find_next_sibling('td', class_='table-value')
-        
-        if alternative_titles_value:
-            titles_text = alternative_titles_value.find('h2').text
-            alternative_titles = [title.strip() for title in titles_text.split(';')]
-            return alternative_titles
+def extract_alternative_titles_from_file(manga_dir):
+    """The alternative titles from the series' saved metadata (see load_series_metadata)."""
+    metadata = load_series_metadata(manga_dir)
+    if metadata is None:
+        print(f"No series metadata (metadata.json or page_content.txt) found in {manga_dir}")
+        return []
 
-    print("No alternative titles found in page_content.txt.")
+    if metadata["alternative_titles"]:
+        return metadata["alternative_titles"]
+
+    print("No alternative titles found in the series metadata.")
     return []
 
 def save_url(manga_dir, url):
     url_file_path = os.path.join(manga_dir, "url.txt")
     with open(url_file_path, "w", encoding="utf-8") as url_file:
         url_file.write(url)
+    get_library().set_series_url(os.path.basename(manga_dir), url)
     print(f"URL saved to {url_file_path}")
 
+chrome_driver_path = None
+
+def get_chrome_driver_path():
+    """Resolve the chromedriver binary once per run instead of on every browser start."""
+    global chrome_driver_path
+    if chrome_driver_path is None:
+        chrome_driver_path = ChromeDriverManager().install()
+    return chrome_driver_path
+
+def normalize_chapter_number(chapter_title):
+    """Chapter number from a title like 'Chapter 12.5: ...' as a float, or None if there is none."""
+    match = re.search(r'Chapter (\d+(\.\d+)?)', chapter_title)
+    return float(match.group(1)) if match else None
+
+class LibraryIndex:
+    """
+    SQLite index of every series and chapter in the library (library.db in base_dir).
+    Replaces parsing each series' download_log.txt; existing logs are imported the first time a series is seen.
+    Each series row also carries a chapter_count/last_updated summary, kept current as chapters are recorded,
+    which is what the combined report is generated from.
+    """
+
+    def __init__(self, db_path):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS series (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL UNIQUE,
+                    url TEXT,
+                    log_imported INTEGER NOT NULL DEFAULT 0,
+                    chapter_count INTEGER NOT NULL DEFAULT 0,
+                    last_updated TEXT,
+                    folder_present INTEGER NOT NULL DEFAULT 1,
+                    last_full_scan TEXT
+                );
+                CREATE TABLE IF NOT EXISTS chapters (
+                    id INTEGER PRIMARY KEY,
+                    series_id INTEGER NOT NULL REFERENCES series(id),
+                    chapter_url TEXT NOT NULL,
+                    chapter_title TEXT,
+                    chapter_number REAL,
+                    cbz_path TEXT,
+                    byte_size INTEGER,
+                    page_count INTEGER,
+                    content_hash TEXT,
+                    status TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    UNIQUE (series_id, chapter_url)
+                );
+                CREATE INDEX IF NOT EXISTS chapters_by_number ON chapters (series_id, chapter_number);
+                CREATE TABLE IF NOT EXISTS library_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                CREATE TABLE IF NOT EXISTS covers (
+                    title_key TEXT PRIMARY KEY,
+                    cover_url TEXT,
+                    checked_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS mirrors (
+                    mirror TEXT PRIMARY KEY,
+                    latency REAL NOT NULL,
+                    failure_rate REAL NOT NULL,
+                    samples INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+            """)
+            # Databases created before the summary columns existed get them added in place
+            columns = {row[1] for row in self.connection.execute("PRAGMA table_info(series)")}
+            for column, definition in (("chapter_count", "INTEGER NOT NULL DEFAULT 0"), ("last_updated", "TEXT"),
+                                       ("folder_present", "INTEGER NOT NULL DEFAULT 1"), ("last_full_scan", "TEXT")):
+                if column not in columns:
+                    self.connection.execute(f"ALTER TABLE series ADD COLUMN {column} {definition}")
+
+    def series_id(self, title):
+        row = self.connection.execute("SELECT id FROM series WHERE title = ?", (title,)).fetchone()
+        if row:
+            return row[0]
+        return self.connection.execute("INSERT INTO series (title) VALUES (?)", (title,)).lastrowid
+
+    def refresh_summary(self, series_id):
+        """Recompute one series' chapter_count and last_updated from its own chapter rows."""
+        self.connection.execute(
+            "UPDATE series SET folder_present = 1, "
+            "chapter_count = (SELECT COUNT(*) FROM chapters WHERE series_id = ?1 AND status = 'done'), "
+            "last_updated = (SELECT MAX(updated_at) FROM chapters WHERE series_id = ?1 AND status = 'done') "
+            "WHERE id = ?1", (series_id,))
+
+    def set_series_url(self, title, url):
+        with self.lock, self.connection:
+            series_id = self.series_id(title)
+            self.connection.execute("UPDATE series SET url = ? WHERE id = ?", (url, series_id))
+
+    def import_download_log(self, title, manga_dir):
+        """Import the series' download_log.txt once. Malformed lines are skipped instead of aborting the import."""
+        with self.lock, self.connection:
+            series_id = self.series_id(title)
+            imported = self.connection.execute("SELECT log_imported FROM series WHERE id = ?", (series_id,)).fetchone()[0]
+            if imported:
+                return
+
+            log_file_path = os.path.join(manga_dir, "download_log.txt")
+            if os.path.exists(log_file_path):
+                with open(log_file_path, "r", encoding="utf-8") as log_file:
+                    for line in log_file:
+                        parts = line.strip().split("\t")
+                        if len(parts) != 3:
+                            print(f"Skipping invalid log entry: {line.strip()}")
+                            continue
+                        chapter_url, chapter_title, last_updated = parts
+                        self.connection.execute(
+                            "INSERT OR IGNORE INTO chapters (series_id, chapter_url, chapter_title, chapter_number, status, updated_at) "
+                            "VALUES (?, ?, ?, ?, 'done', ?)",
+                            (series_id, chapter_url, chapter_title, normalize_chapter_number(chapter_title), last_updated))
+                print(f"Imported {log_file_path} into the library index.")
+
+            self.connection.execute("UPDATE series SET log_imported = 1 WHERE id = ?", (series_id,))
+            self.refresh_summary(series_id)
+
+    def needs_full_scan(self, title, interval_days):
+        """True if the series' chapter list has not been walked end to end in the last interval_days."""
+        with self.lock:
+            row = self.connection.execute("SELECT last_full_scan FROM series WHERE title = ?", (title,)).fetchone()
+        if row is None or row[0] is None:
+            return True
+        return (datetime.now() - datetime.fromisoformat(row[0])).total_seconds() >= interval_days * 86400
+
+    def mark_full_scan(self, title):
+        with self.lock, self.connection:
+            series_id = self.series_id(title)
+            self.connection.execute("UPDATE series SET last_full_scan = ? WHERE id = ?", (datetime.now().isoformat(), series_id))
+
+    def cached_cover(self, title_key, negative_ttl_days):
+        """
+        (True, cover_url) when the title was looked up before, cover_url being None if it had no cover;
+        (False, None) when it has to be looked up. Misses older than negative_ttl_days are looked up again.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT cover_url, checked_at FROM covers WHERE title_key = ?", (title_key,)).fetchone()
+        if row is None:
+            return False, None
+        cover_url, checked_at = row
+        if cover_url is None and (datetime.now() - datetime.fromisoformat(checked_at)).days >= negative_ttl_days:
+            return False, None
+        return True, cover_url
+
+    def store_cover(self, title_key, cover_url):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO covers (title_key, cover_url, checked_at) VALUES (?, ?, ?)",
+                (title_key, cover_url, datetime.now().isoformat()))
+
+    def mirror_scores(self):
+        """Saved mirror scores: {mirror: (latency, failure_rate, samples, updated_at)}."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT mirror, latency, failure_rate, samples, updated_at FROM mirrors").fetchall()
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def store_mirror_scores(self, scores):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO mirrors (mirror, latency, failure_rate, samples, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(mirror, *score) for mirror, score in scores.items()])
+
+    def completed_chapter_urls(self, title):
+        """Set of chapter URLs already downloaded for the series, for O(1) membership checks."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT chapter_url FROM chapters JOIN series ON series.id = chapters.series_id "
+                "WHERE series.title = ? AND chapters.status = 'done'", (title,)).fetchall()
+        return {row[0] for row in rows}
+
+    def record_chapter(self, title, chapter_url, chapter_title, cbz_path=None, byte_size=None,
+                       page_count=None, content_hash=None, status="done"):
+        with self.lock, self.connection:
+            series_id = self.series_id(title)
+            self.connection.execute(
+                "INSERT INTO chapters (series_id, chapter_url, chapter_title, chapter_number, cbz_path, byte_size, "
+                "page_count, content_hash, status, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (series_id, chapter_url) DO UPDATE SET chapter_title = excluded.chapter_title, "
+                "chapter_number = excluded.chapter_number, cbz_path = excluded.cbz_path, byte_size = excluded.byte_size, "
+                "page_count = excluded.page_count, content_hash = excluded.content_hash, status = excluded.status, "
+                "updated_at = excluded.updated_at",
+                (series_id, chapter_url, chapter_title, normalize_chapter_number(chapter_title), cbz_path, byte_size,
+                 page_count, content_hash, status, datetime.now().isoformat()))
+            self.refresh_summary(series_id)
+
+    def summary(self):
+        """(title, chapter_count, last_updated) for every series on disk with at least one chapter."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT title, chapter_count, last_updated FROM series "
+                "WHERE folder_present = 1 AND chapter_count > 0 ORDER BY title").fetchall()
+
+    def is_reconciled(self):
+        with self.lock:
+            return self.connection.execute("SELECT 1 FROM library_meta WHERE key = 'reconciled_at'").fetchone() is not None
+
+    def reconcile(self, library_dir):
+        """
+        Bring the index in line with the folders actually in library_dir.
+        A single scandir pass: new folders have their download_log.txt imported, missing ones are hidden from the summary.
+        """
+        folder_titles = set()
+        with os.scandir(library_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    folder_titles.add(entry.name)
+                    self.import_download_log(entry.name, entry.path)
+
+        with self.lock, self.connection:
+            for series_id, title, folder_present in self.connection.execute(
+                    "SELECT id, title, folder_present FROM series").fetchall():
+                present = int(title in folder_titles)
+                if present != folder_present:
+                    self.connection.execute("UPDATE series SET folder_present = ? WHERE id = ?", (present, series_id))
+            self.connection.execute(
+                "INSERT OR REPLACE INTO library_meta (key, value) VALUES ('reconciled_at', ?)", (datetime.now().isoformat(),))
+
+library_index = None
+
+def get_library():
+    """Return the library index for base_dir, opening it on first use."""
+    global library_index
+    if library_index is None:
+        library_index = LibraryIndex(os.path.join(base_dir, "library.db"))
+    return library_index
+
+class CachedPage:
+    """
+    A series or chapter page served from the page cache.
+    changed is False when the body is the same as the last time the page was fetched.
+    """
+
+    def __init__(self, cache, url, body, digest, memo, changed):
+        self.cache = cache
+        self.url = url
+        self.body = body
+        self.digest = digest
+        self.memo = memo
+        self.changed = changed
+
+    @property
+    def text(self):
+        return zlib.decompress(self.body).decode("utf-8")
+
+    def parse(self, key, parser):
+        """
+        Return parser(self.text), memoized in the cache for as long as the page body does not change.
+        The result must be JSON serializable.
+        """
+        if key not in self.memo:
+            self.memo[key] = parser(self.text)
+            self.cache.save_memo(self.url, self.digest, self.memo)
+        return self.memo[key]
+
+class PageCache:
+    """
+    On-disk HTTP cache for series and chapter pages (page_cache.db in base_dir).
+    Bodies are stored zlib-compressed with their ETag/Last-Modified validators and the parse results
+    memoized for them. The least recently used pages are evicted once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, db_path, max_bytes=page_cache_max_bytes):
+        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.stats = {"fresh": 0, "not_modified": 0, "fetched": 0}
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        # The compressed body comes last in each row, so reading the other columns never reads through it
+        pages_table = """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    digest TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    memo TEXT,
+                    body BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS pages_by_access ON pages (accessed_at, size);
+        """
+        with self.connection:
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(pages)")]
+            if columns and columns.index("body") < columns.index("size"):
+                # Caches created with the body before the size columns are rebuilt in the new order once
+                self.connection.executescript("""
+                    DROP INDEX IF EXISTS pages_by_access;
+                    ALTER TABLE pages RENAME TO pages_old;
+                """ + pages_table + """
+                    INSERT INTO pages (url, size, digest, etag, last_modified, fetched_at, accessed_at, memo, body)
+                        SELECT url, size, digest, etag, last_modified, fetched_at, accessed_at, memo, body FROM pages_old;
+                    DROP TABLE pages_old;
+                """)
+            self.connection.executescript(pages_table)
+            # Kept current by store and evict, so storing a page never has to add up the whole cache
+            self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def lookup(self, url):
+        """Return (page, fetched_at, etag, last_modified) for a cached URL, or None."""
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT body, digest, memo, fetched_at, etag, last_modified FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        body, digest, memo, fetched_at, etag, last_modified = row
+        return CachedPage(self, url, body, digest, json.loads(memo) if memo else {}, False), fetched_at, etag, last_modified
+
+    def revalidated(self, url):
+        """A 304 response: the cached copy is fresh again."""
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def store(self, url, text, etag=None, last_modified=None):
+        content = text.encode("utf-8")
+        digest = hashlib.sha1(content).hexdigest()
+        body = zlib.compress(content)
+        now = time.time()
+
+        with self.lock, self.connection:
+            row = self.connection.execute("SELECT digest, memo, size FROM pages WHERE url = ?", (url,)).fetchone()
+            changed = row is None or row[0] != digest
+            # The memoized parse results stay valid as long as the body is byte-for-byte the same
+            memo = None if changed else row[1]
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages (url, size, digest, etag, last_modified, fetched_at, accessed_at, memo, body) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, len(body), digest, etag, last_modified, now, now, memo, body))
+            self.total_bytes += len(body) - (row[2] if row else 0)
+            self.evict()
+        return CachedPage(self, url, body, digest, json.loads(memo) if memo else {}, changed)
+
+    def save_memo(self, url, digest, memo):
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE pages SET memo = ? WHERE url = ? AND digest = ?", (json.dumps(memo), url, digest))
+
+    def evict(self):
+        """Drop the least recently used pages while the running total is over max_bytes."""
+        while self.total_bytes > self.max_bytes:
+            rows = self.connection.execute("SELECT url, size FROM pages ORDER BY accessed_at LIMIT 100").fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            for url, size in rows:
+                self.connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    return
+
+page_cache = None
+
+def get_page_cache():
+    """Return the page cache for base_dir, opening it on first use."""
+    global page_cache
+    if page_cache is None:
+        page_cache = PageCache(os.path.join(base_dir, "page_cache.db"))
+    return page_cache
+
+def fetch_cached_page(url):
+    """
+    GET a series or chapter page through the page cache.
+    Fresh entries cost no request at all; stale ones are revalidated with a conditional GET and a 304
+    reuses the cached body and its memoized parse results.
+    """
+    cache = get_page_cache()
+    cached = cache.lookup(url)
+    request_headers = {}
+    if cached is not None:
+        page, fetched_at, etag, last_modified = cached
+        if time.time() - fetched_at < page_cache_ttl:
+            cache.stats["fresh"] += 1
+            return page
+        if etag:
+            request_headers["If-None-Match"] = etag
+        if last_modified:
+            request_headers["If-Modified-Since"] = last_modified
+
+    response = get_transport().get(url, headers=request_headers)
+    if response.status_code == 304 and cached is not None:
+        cache.revalidated(url)
+        cache.stats["not_modified"] += 1
+        return page
+
+    response.raise_for_status()
+    cache.stats["fetched"] += 1
+    return cache.store(url, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+class PageStore:
+    """
+    Content-addressed store of downloaded page images (page_store.db in base_dir).
+    Bytes are kept once per SHA-256 and every image URL seen is mapped to the hash of its bytes, so pages
+    repeated across chapters are stored once and a URL fetched before is never downloaded again.
+    The least recently used images are evicted once the store exceeds max_bytes.
+    """
+
+    def __init__(self, db_path, max_bytes=page_store_max_bytes):
+        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.stats = {"url_hits": 0, "bytes_not_downloaded": 0, "duplicates": 0, "bytes_deduplicated": 0}
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        # The image bytes come last in each row, so reading size and accessed_at never reads through them
+        blobs_table = """
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    content BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS blobs_by_access ON blobs (accessed_at, size);
+        """
+        with self.connection:
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(blobs)")]
+            if columns and columns.index("content") < columns.index("size"):
+                # Stores created with the bytes before the size columns are rebuilt in the new order once
+                self.connection.executescript("""
+                    DROP INDEX IF EXISTS blobs_by_access;
+                    ALTER TABLE blobs RENAME TO blobs_old;
+                """ + blobs_table + """
+                    INSERT INTO blobs (hash, size, accessed_at, content) SELECT hash, size, accessed_at, content FROM blobs_old;
+                    DROP TABLE blobs_old;
+                """)
+            self.connection.executescript(blobs_table + """
+                CREATE TABLE IF NOT EXISTS urls (
+                    url TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS urls_by_hash ON urls (hash);
+            """)
+            # Kept current by put and evict, so storing a page never has to add up the whole store
+            self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def get(self, url):
+        """Bytes of an image URL downloaded before, or None."""
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT blobs.hash, blobs.content FROM urls JOIN blobs ON blobs.hash = urls.hash WHERE urls.url = ?",
+                (url,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE blobs SET accessed_at = ? WHERE hash = ?", (time.time(), row[0]))
+            self.stats["url_hits"] += 1
+            self.stats["bytes_not_downloaded"] += len(row[1])
+        return row[1]
+
+    def put(self, url, content):
+        """Store a verified page under its hash and map the URL to it. Returns the hash."""
+        digest = hashlib.sha256(content).hexdigest()
+        with self.lock, self.connection:
+            updated = self.connection.execute(
+                "UPDATE blobs SET accessed_at = ? WHERE hash = ?", (time.time(), digest)).rowcount
+            if updated:
+                self.stats["duplicates"] += 1
+                self.stats["bytes_deduplicated"] += len(content)
+            else:
+                self.connection.execute(
+                    "INSERT INTO blobs (hash, size, accessed_at, content) VALUES (?, ?, ?, ?)",
+                    (digest, len(content), time.time(), content))
+            self.connection.execute("INSERT OR REPLACE INTO urls (url, hash) VALUES (?, ?)", (url, digest))
+            if not updated:
+                self.total_bytes += len(content)
+                self.evict()
+        return digest
+
+    def evict(self):
+        """Drop the least recently used images while the running total is over max_bytes."""
+        while self.total_bytes > self.max_bytes:
+            rows = self.connection.execute("SELECT hash, size FROM blobs ORDER BY accessed_at LIMIT 100").fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            for digest, size in rows:
+                self.connection.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                self.connection.execute("DELETE FROM urls WHERE hash = ?", (digest,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    return
+
+page_store = None
+page_store_lock = threading.Lock()
+
+def get_page_store():
+    """Return the page store for base_dir, opening it on first use (usually from several page workers at once)."""
+    global page_store
+    with page_store_lock:
+        if page_store is None:
+            page_store = PageStore(os.path.join(base_dir, "page_store.db"))
+    return page_store
+
 def init_selenium():
+    load_browser_backend()
     chrome_options = Options()
+    if browser_headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
     chrome_options.add_argument("--start-maximized")  # Simulate a maximized window
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")  # Bypass Selenium automation detection
     chrome_options.add_argument("--disable-extensions")  # Disable extensions
@@ -95,7 +1071,7 @@ def init_selenium():
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     
     # Start Chrome with the necessary options
-    chrome_service = Service(ChromeDriverManager().install())
+    chrome_service = Service(get_chrome_driver_path())
     driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
 
     # Set a custom user-agent to mimic a real browser
@@ -105,382 +1081,933 @@ def init_selenium():
 
     return driver
 
-def human_like_interaction(driver):
-    time.sleep(random.uniform(2, 5))  # Random delay between 2-5 seconds
-    
-    # Simulate scrolling
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(random.uniform(1, 3))
-    driver.execute_script("window.scrollTo(0, 0);")
-    time.sleep(random.uniform(2, 5))
+class BrowserPool:
+    """
+    Pool of long-lived Chrome drivers. Callers check a driver out with browser() and it is
+    reset and returned afterwards; drivers that crashed are replaced on the next checkout.
+    """
+
+    def __init__(self, size=browser_pool_size):
+        self.size = size
+        self.idle = []
+        self.created = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while not self.idle and self.created >= self.size:
+                self.condition.wait()
+            if self.idle:
+                driver = self.idle.pop()
+            else:
+                driver = None
+                self.created += 1
+
+        if driver is not None and self.is_alive(driver):
+            return driver
+
+        if driver is not None:
+            print("Browser in pool crashed. Starting a replacement.")
+            self.quit_driver(driver)
+        try:
+            with run_metrics.stage("browser_start"):
+                return init_selenium()
+        except Exception:
+            with self.condition:
+                self.created -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, driver, broken=False):
+        if not broken:
+            broken = not self.reset(driver)
+
+        with self.condition:
+            if broken:
+                self.created -= 1
+            else:
+                self.idle.append(driver)
+            self.condition.notify()
+
+        if broken:
+            self.quit_driver(driver)
+
+    @contextmanager
+    def browser(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def is_alive(self, driver):
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def reset(self, driver):
+        """Clear cookies and extra tabs so the next user gets a clean browser. Returns False if the driver is unusable."""
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except WebDriverException:
+            return False
+
+    def quit_driver(self, driver):
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def close_all(self):
+        with self.condition:
+            drivers, self.idle = self.idle, []
+            self.created -= len(drivers)
+        for driver in drivers:
+            self.quit_driver(driver)
+
+browser_pool = None
+browser_pool_lock = threading.Lock()
+
+def get_browser_pool():
+    """Return the shared browser pool, creating it on first use (possibly from several page workers at once)."""
+    global browser_pool
+    with browser_pool_lock:
+        if browser_pool is None:
+            load_browser_backend()
+            browser_pool = BrowserPool()
+            atexit.register(browser_pool.close_all)
+    return browser_pool
+
+def wait_for_page_ready(driver, timeout=None):
+    """Wait until the document has finished loading. Returns False if it did not within the timeout."""
+    try:
+        WebDriverWait(driver, timeout or browser_wait_timeout).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+        return True
+    except TimeoutException:
+        return False
+
+def open_resumable(img_url, partial_path, **kwargs):
+    """
+    Start a streamed GET that continues the bytes already in partial_path with a Range request.
+    Returns (response, resume_from): resume_from is how many bytes of partial_path the response continues,
+    0 when the body starts over (no partial file, or the server ignored the Range and sent everything).
+    """
+    resume_from = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+    request_headers = {"Range": f"bytes={resume_from}-"} if resume_from else {}
+    response = get_transport().get(img_url, kind="image", stream=True, headers=request_headers, **kwargs)
+    if resume_from and response.status_code == 416:
+        # The partial file is already as long as (or longer than) the image: there is nothing to continue, so
+        # fetch the whole image again rather than fail the page on every attempt
+        response.close()
+        os.remove(partial_path)
+        return open_resumable(img_url, partial_path, **kwargs)
+    if not resume_from or response.status_code != 206 and response.status_code != 200:
+        return response, resume_from
+    if response.status_code == 200:
+        return response, 0
+
+    if not response.headers.get("Content-Range", "").startswith(f"bytes {resume_from}-"):
+        # Not the continuation we asked for: drop the partial file and start from byte zero
+        response.close()
+        os.remove(partial_path)
+        return open_resumable(img_url, partial_path, **kwargs)
+    return response, resume_from
 
 def download_image(img_url, save_dir, save_name, max_retries=3):
-    """Download image with retry mechanism."""
+    """Download image with retry mechanism. Retries continue an interrupted transfer instead of starting over."""
     save_path = os.path.join(save_dir, save_name)
+    partial_path = save_path + ".part"
     retries = 0
 
     while retries < max_retries:
         try:
-            session = requests.Session()
-            # Set default headers, customize as needed
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0',
-            })
-            
-            with session.get(img_url, stream=True, timeout=10) as img_response:
+            img_response, resume_from = open_resumable(img_url, partial_path)
+            with img_response:
                 img_response.raise_for_status()
 
-                with open(save_path, 'wb') as img_file:
+                with open(partial_path, 'ab' if resume_from else 'wb') as img_file:
                     for chunk in img_response.iter_content(chunk_size=8192):
                         if chunk:
                             img_file.write(chunk)
-            
+            os.replace(partial_path, save_path)
+
             print(f"Image successfully downloaded and saved at: {save_path}")
             return True
         
         except requests.exceptions.RequestException as e:
             retries += 1
+            run_metrics.count("retries", url=img_url)
             print(f"Attempt {retries} failed: {e}. Retrying...")
             time.sleep(2)
     
     print(f"Failed to download image after {max_retries} attempts.")
     return False
 
-def download_cover_from_mangadex(manga_title, manga_dir):
-    """Attempt to download the cover image from MangaDex using Selenium."""
-    driver = init_selenium()
-    try:
-        search_url = f"https://mangadex.org/search?q={manga_title.replace(' ', '+')}"
-        driver.get(search_url)
-        time.sleep(3)  # Allow time for page load
-
-        first_manga_card = driver.find_element(By.CSS_SELECTOR, 'div.grid.gap-2 img.rounded.shadow-md')
-        if first_manga_card:
-            cover_img_url = first_manga_card.get_attribute('src')
-            return download_image(cover_img_url, manga_dir, 'cover.jpg')
+def normalize_title(title):
+    """Cache key for a title: lowercase words without punctuation or extra spaces."""
+    return " ".join(re.sub(r"[^\w\s]", " ", title.lower()).split())
 
-        print(f"No cover image found for {manga_title} on MangaDex.")
-        return False
-
-    except Exception as e:
-        print(f"Error downloading cover from MangaDex: {e}")
-        return False
-
-    finally:
-        driver.quit()
+def lookup_mangadex_cover(title):
+    """URL of the original cover of the best MangaDex match for a title, from the public API, or None if there is none."""
+    response = get_transport().get(f"{mangadex_api_url}/manga",
+                                   params={"title": title, "limit": 1, "includes[]": "cover_art"})
+    response.raise_for_status()
+    for manga in response.json().get("data", []):
+        for relationship in manga.get("relationships", []):
+            file_name = relationship.get("attributes", {}).get("fileName") if relationship.get("type") == "cover_art" else None
+            if file_name:
+                return f"{mangadex_covers_url}/{manga['id']}/{file_name}"
+    return None
+
+def resolve_cover_url(title):
+    """
+    Cover URL for a title through the library's title->cover cache. Titles without a cover are cached too;
+    failed lookups are not, so they are retried on the next run.
+    """
+    library = get_library()
+    title_key = normalize_title(title)
+    cached, cover_url = library.cached_cover(title_key, cover_negative_ttl_days)
+    if cached:
+        return cover_url
 
-def search_using_alternative_titles(manga_title, manga_dir, alt_site_url):
-    """Search for alternative titles and attempt to download cover image using them."""
     try:
-        response = requests.get(alt_site_url, headers={'User-Agent': 'Mozilla/5.0'})
-        response.raise_for_status()
-        html_content = response.text
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching alternative titles from {alt_site_url}: {e}")
+        cover_url = lookup_mangadex_cover(title)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Cover lookup failed for '{title}': {e}")
+        return None
+    library.store_cover(title_key, cover_url)
+    return cover_url
+
+def fetch_cover(manga_title, manga_dir, alternative_titles=()):
+    """
+    Download the original cover of a series over plain HTTP, without a browser.
+    The main title is looked up first, then all alternative titles at once; the first match in title order wins.
+    The image is saved with its own extension (cover.jpg, cover.png, ...). Returns True if a cover was saved.
+    """
+    cover_url = resolve_cover_url(manga_title)
+
+    title_key = normalize_title(manga_title)
+    alternative_titles = [title for title in alternative_titles if normalize_title(title) != title_key]
+    if cover_url is None and alternative_titles:
+        with ThreadPoolExecutor(max_workers=min(len(alternative_titles), 4)) as executor:
+            cover_urls = list(executor.map(resolve_cover_url, alternative_titles))
+        for alt_title, alt_cover_url in zip(alternative_titles, cover_urls):
+            if alt_cover_url:
+                print(f"Cover found using alternative title: {alt_title}")
+                cover_url = alt_cover_url
+                break
+
+    if cover_url is None:
+        print(f"No cover found on MangaDex for {manga_title}.")
         return False
 
-    alternative_titles = extract_alternative_titles(html_content)
-
-    if alternative_titles:
-        print(f"Alternative titles found: {alternative_titles}")
-        for alt_title in alternative_titles:
-            if download_cover_from_mangadex(alt_title, manga_dir):
-                print(f"Cover image downloaded using alternative title: {alt_title}")
-                return True
-    print(f"Failed to download cover image using alternative titles.")
-    return False
+    extension = os.path.splitext(urlparse(cover_url).path)[1].lower() or ".jpg"
+    return download_image(cover_url, manga_dir, f"cover{extension}")
 
-def extract_alternative_titles(html_content):
-    """Extract alternative manga titles from the HTML content."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    alternative_titles_tag = soup.find('td', class_='table-label', string='Alternative')
+def existing_cover(manga_dir):
+    for name in os.listdir(manga_dir):
+        if os.path.splitext(name)[0] == "cover" and not name.endswith(".part"):
+            return os.path.join(manga_dir, name)
+    return None
 
-    if alternative_titles_tag:
-        alternative_titles_value = alternative_titles_tag.find_next_sibling('td', class_='table-value')
-        if alternative_titles_value:
-            titles_text = alternative_titles_value.get_text(separator=';')
-            alternative_titles = [title.strip() for title in titles_text.split(';') if title.strip()]
-            return alternative_titles
+def extract_and_download_cover(manga_dir, html_file_path, base_url, manga_title, alt_site_url):
+    cover_path = existing_cover(manga_dir)
+    if cover_path:
+        print(f"Cover already downloaded: {cover_path}")
+        return
 
-    return []
+    if fetch_cover(manga_title, manga_dir, extract_alternative_titles_from_file(manga_dir)):
+        return
 
-def search_using_alternative_titles(manga_title, manga_dir, alt_site_url):
-    # Download and parse the alternative website HTML
-    try:
-        html_content = requests.get(alt_site_url, headers=headers).text
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to access {alt_site_url}: {e}")
-        return False
+    print("Falling back to original method to download cover image.")
+    metadata = load_series_metadata(manga_dir)
+    if not metadata or not metadata["cover_url"]:
+        log_error(manga_dir, "Cover image tag not found or missing 'src' attribute.")
+        return
 
-    alternative_titles = extract_alternative_titles(html_content)
+    cover_img_url = urljoin(base_url, metadata["cover_url"])
+    download_image(cover_img_url, manga_dir, "cover.jpg")
 
-    if alternative_titles:
-        print(f"Alternative titles found: {alternative_titles}")
-        for alt_title in alternative_titles:
-            if download_cover_from_mangadex(alt_title, manga_dir):
-                print(f"Cover image downloaded using alternative title: {alt_title}")
-                return True
+class ChapterProgress:
+    """
+    Progress accounting for one chapter, fed by the streaming GET responses instead of a HEAD pass.
+    The expected total is refined as each page's Content-Length arrives; pages that have not
+    reported a size yet are estimated from the average of the pages that have.
+    """
 
-    print("Failed to download cover image using alternative titles.")
-    return False
+    def __init__(self, chapter_title, page_count):
+        self.page_count = page_count
+        self.sized_pages = 0
+        self.sized_bytes = 0
+        self.downloaded = 0
+        self.lock = threading.Lock()
+        from tqdm import tqdm
+        self.bar = tqdm(total=None, desc=f"Downloading {chapter_title}", unit="B", unit_scale=True)
+
+    def expect(self, content_length):
+        """Record the size of a page whose response headers just arrived (None if the server sent no length)."""
+        with self.lock:
+            if content_length is not None:
+                self.sized_pages += 1
+                self.sized_bytes += content_length
+                self.refresh_total()
+
+    def advance(self, byte_count):
+        with self.lock:
+            self.downloaded += byte_count
+            self.bar.update(byte_count)
+
+    def page_done(self, byte_count, content_length):
+        """A page finished; pages without a Content-Length count with their real size from now on."""
+        with self.lock:
+            if content_length is None:
+                self.sized_pages += 1
+                self.sized_bytes += byte_count
+                self.refresh_total()
+
+    def page_failed(self):
+        with self.lock:
+            self.page_count = max(self.page_count - 1, self.sized_pages)
+            self.refresh_total()
+
+    def page_skipped(self):
+        """A page that needs no download, e.g. one restored from a chapter checkpoint."""
+        with self.lock:
+            self.page_count = max(self.page_count - 1, self.sized_pages)
+            self.refresh_total()
+
+    def refresh_total(self):
+        if not self.sized_pages:
+            return
+        average_size = self.sized_bytes / self.sized_pages
+        estimate = self.sized_bytes + average_size * max(self.page_count - self.sized_pages, 0)
+        self.bar.total = max(int(estimate), self.downloaded)
+        self.bar.refresh()
 
-def search_mangadex_and_download_cover_selenium(manga_title, manga_dir, alt_site_url):
-    driver = None  # Initialize driver to None for better exception handling
-    try:
-        driver = init_selenium()  # Initialize Selenium driver
-        cleaned_title = clean_title_for_search(manga_title)
-        search_url = f"https://mangadex.org/search?q={cleaned_title}"
-        print(f"Searching for {manga_title} on MangaDex using Selenium: {search_url}")
-        
-        driver.get(search_url)
-        human_like_interaction(driver)  # Simulate human behavior on the page
+    def close(self):
+        self.bar.close()
 
-        # Try to find the first manga card that has an image
-        first_manga_card = driver.find_element(By.CSS_SELECTOR, 'div.grid.gap-2 img.rounded.shadow-md')
-        if not first_manga_card:
-            print(f"No results found on MangaDex for {manga_title}. Falling back to alternative titles...")
-            return search_using_alternative_titles_from_file(manga_title, manga_dir)
+class DownloadCancelled(requests.exceptions.RequestException):
+    """A page download stopped on purpose because a hedged copy of the page finished first."""
 
-        # Get the cover image URL
-        cover_img_url = first_manga_card.get_attribute('src')
-        print(f"Found cover image via Selenium: {cover_img_url}")
+class PageTimeout(requests.exceptions.Timeout):
+    """A page download that kept streaming for longer than page_timeout."""
 
-        # Download and save the image using Selenium
-        driver.get(cover_img_url)
-        time.sleep(2)  # Wait for the image to fully load
-        save_path = os.path.join(manga_dir, "cover.jpg")
+def read_streamed_content(img_response, progress=None, partial_file=None, cancel=None):
+    """
+    Read a streamed response body chunk by chunk, reporting sizes to the chapter progress as they arrive.
+    With partial_file the chunks are written to that file as they arrive instead of being collected.
+    Raises DownloadCancelled once the cancel event is set, and PageTimeout after page_timeout seconds.
+    """
+    content_length = img_response.headers.get('Content-Length')
+    content_length = int(content_length) if content_length and content_length.isdigit() else None
+    if progress is not None:
+        progress.expect(content_length)
+
+    chunks = []
+    byte_count = 0
+    started = time.monotonic()
+    for chunk in img_response.iter_content(chunk_size=65536):
+        if cancel is not None and cancel.is_set():
+            raise DownloadCancelled(f"Download of {img_response.url} cancelled")
+        if time.monotonic() - started > page_timeout:
+            raise PageTimeout(f"Download of {img_response.url} took longer than {page_timeout}s")
+        if chunk:
+            byte_count += len(chunk)
+            if partial_file is not None:
+                partial_file.write(chunk)
+            else:
+                chunks.append(chunk)
+            if progress is not None:
+                progress.advance(len(chunk))
 
-        # Save the image as a screenshot
-        with open(save_path, "wb") as file:
-            file.write(driver.find_element(By.TAG_NAME, "img").screenshot_as_png)
+    if progress is not None:
+        progress.page_done(byte_count, content_length)
+    return b"".join(chunks)
 
-        print(f"Image downloaded and saved at: {save_path}")
-        return True
+def switch_server(driver, server_number):
+    server_buttons = driver.find_elements(By.CLASS_NAME, 'server-image-btn')
+    if server_buttons and len(server_buttons) >= server_number:
+        old_images = driver.find_elements(By.CSS_SELECTOR, 'div.container-chapter-reader img')
+        old_src = old_images[0].get_attribute('src') if old_images else None
+        server_buttons[server_number - 1].click()
+        run_metrics.count("server_switches", url=driver.current_url)
 
-    except Exception as e:
-        log_error(manga_dir, f"Error searching or downloading cover using Selenium: {e}")
-        # Fall back to alternative titles if there was an error
-        return search_using_alternative_titles_from_file(manga_title, manga_dir)
+        # The reader either reloads the page or swaps the images in place: wait for whichever happens
+        if old_images:
+            try:
+                WebDriverWait(driver, browser_wait_timeout).until(
+                    lambda d: EC.staleness_of(old_images[0])(d) or old_images[0].get_attribute('src') != old_src
+                )
+            except TimeoutException:
+                print(f"Images did not change after switching to server {server_number}.")
+        wait_for_page_ready(driver)
+    else:
+        print(f"Failed to switch to server {server_number}")
 
-    finally:
-        if driver:
-            driver.quit()  
+def download_image_convert(img_url, progress=None, cancel=None):
+    """
+    Download a page into memory and return its validated bytes, or None if it failed (or was cancelled).
+    Each page is validated once: header sniffing and a truncation check on the raw bytes.
+    Conversion to the configured format happens afterwards in the transcoding stage.
+    Validated pages are added to the page store; callers check it before downloading.
+    """
+    try:
+        with run_metrics.stage("image", img_url), get_transport().get(img_url, kind="image", stream=True) as img_response:
+            img_response.raise_for_status()  # Ensure the request was successful
 
-def search_using_alternative_titles_from_file(manga_title, manga_dir):
-    alternative_titles = extract_alternative_titles_from_file(manga_dir)
+            # Check if the response is an image by inspecting the Content-Type header
+            content_type = img_response.headers.get('Content-Type', '')
+            if 'image' not in content_type:
+                print(f"URL did not return an image: {img_url}, Content-Type: {content_type}")
+                return None
 
-    if alternative_titles:
-        print(f"Alternative titles found in page_content.txt: {alternative_titles}")
-        for alt_title in alternative_titles:
-            if download_cover_from_mangadex(alt_title, manga_dir):
-                print(f"Cover image downloaded using alternative title: {alt_title}")
-                return True
+            content = read_streamed_content(img_response, progress, cancel=cancel)
 
-    print("Failed to download cover image using alternative titles.")
-    return False
+    except DownloadCancelled:
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to download/convert image: {img_url}, error: {e}")
+        return None
 
-def extract_and_download_cover(manga_dir, html_file_path, base_url, manga_title, alt_site_url):
-    success = search_mangadex_and_download_cover_selenium(manga_title, manga_dir, alt_site_url)  # Use Selenium-based search
-    if success:
-        return
+    run_metrics.count("bytes_downloaded", len(content), img_url)
+    content = prepare_page(content, img_url)
+    if content is not None:
+        get_page_store().put(img_url, content)
+    return content
 
-    print("Falling back to original method to download cover image.")
-    with open(html_file_path, "r", encoding="utf-8") as file:
-        html_content = file.read()
+class HedgePolicy:
+    """
+    Recent page times per CDN host and the hedging budget. A page gets a duplicate request once it has taken longer
+    than hedge_percentile of its host's recent pages, as long as duplicates stay within hedge_budget of all pages.
+    """
 
-    soup = BeautifulSoup(html_content, 'html.parser')
-    cover_img_tag = soup.select_one('div.panel-story-info div.story-info-left img.img-loading')
-    
-    if not cover_img_tag or not cover_img_tag.get('src'):
-        log_error(manga_dir, "Cover image tag not found or missing 'src' attribute.")
-        return
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}  # host -> the last hedge_window page times
+        self.pages = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def record(self, host, seconds):
+        with self.lock:
+            self.latencies.setdefault(host, deque(maxlen=hedge_window)).append(seconds)
+
+    def start_page(self, host):
+        """Count a page request; returns the seconds after which it gets hedged, or None if it is not hedged."""
+        with self.lock:
+            self.pages += 1
+            samples = sorted(self.latencies.get(host, ()))
+        if not hedge_requests or len(samples) < hedge_min_samples:
+            return None
+        return max(samples[min(int(len(samples) * hedge_percentile), len(samples) - 1)], hedge_min_delay)
+
+    def allow_hedge(self):
+        with self.lock:
+            if self.hedges >= max(1, hedge_budget * self.pages):
+                return False
+            self.hedges += 1
+            return True
 
-    cover_img_url = urljoin(base_url, cover_img_tag['src'])
-    download_image(cover_img_url, manga_dir, "cover.jpg")
+    def won(self):
+        with self.lock:
+            self.wins += 1
 
+hedge_policy = HedgePolicy()
+hedge_pool = None
+hedge_pool_lock = threading.Lock()
 
+def get_hedge_pool():
+    """Threads that run hedged page requests, so the page worker can take whichever copy finishes first."""
+    global hedge_pool
+    with hedge_pool_lock:
+        if hedge_pool is None:
+            hedge_pool = ThreadPoolExecutor(max_workers=2 * image_workers * max(series_workers, 1))
+        return hedge_pool
 
+def complete_page(content):
+    image_format = sniff_image_format(content) if content else None
+    return image_format is not None and check_image_complete(content, image_format)
 
+def fetch_hedged(download, img_url, progress=None, alternate_url=None):
+    """
+    Run download(url, progress, cancel) for one page, hedged when hedge_requests is on: if the page is not done by
+    its host's deadline and the budget allows, a duplicate request goes to alternate_url (or the same URL). The first
+    complete image wins and the other request is cancelled. cancel is None when the page is not hedged.
+    Returns the page bytes, or None.
+    """
+    deadline = hedge_policy.start_page(urlparse(img_url).netloc)
+
+    def attempt(url, attempt_progress, cancel):
+        started = time.perf_counter()
+        content = download(url, attempt_progress, cancel)
+        if content is not None and (cancel is None or not cancel.is_set()):
+            hedge_policy.record(urlparse(url).netloc, time.perf_counter() - started)
+        return content
+
+    if deadline is None:
+        return attempt(img_url, progress, None)
+
+    primary_cancel = threading.Event()
+    primary = get_hedge_pool().submit(contextvars.copy_context().run, attempt, img_url, progress, primary_cancel)
+    done, _ = wait([primary], timeout=deadline)
+    if done or not hedge_policy.allow_hedge():
+        return primary.result()
+
+    # The duplicate reports no progress, so the chapter's byte count is not doubled
+    hedge_url = alternate_url or img_url
+    run_metrics.count("hedges", url=hedge_url)
+    hedge_cancel = threading.Event()
+    hedge = get_hedge_pool().submit(contextvars.copy_context().run, attempt, hedge_url, None, hedge_cancel)
+    cancels = {primary: primary_cancel, hedge: hedge_cancel}
+    primary_content = None
+    for future in as_completed(cancels):
+        content = future.result()
+        if complete_page(content):
+            for other, cancel in cancels.items():
+                if other is not future:
+                    cancel.set()
+            if future is hedge:
+                hedge_policy.won()
+                run_metrics.count("hedges_won", url=hedge_url)
+            return content
+        if future is primary:
+            primary_content = content
+    return primary_content
+
+def check_image_complete(content, image_format):
+    """Cheap truncation check on the raw bytes of a sniffed image, without decoding it."""
+    if image_format == "jpeg":
+        return content.rstrip(b"\x00")[-2:] == b"\xff\xd9"
+    if image_format == "png":
+        return content.endswith(b"IEND\xaeB`\x82")
+    if image_format == "gif":
+        return content.rstrip(b"\x00")[-1:] == b"\x3b"
+    if image_format == "webp":
+        return len(content) >= int.from_bytes(content[4:8], "little") + 8
+    return False
 
-def switch_server(driver, server_number):
-    server_buttons = driver.find_elements(By.CLASS_NAME, 'server-image-btn')
-    if server_buttons and len(server_buttons) >= server_number:
-        server_buttons[server_number - 1].click()
-        time.sleep(2)  # Wait for page to load
+def prepare_page(content, img_url):
+    """Validate a downloaded page once from its raw bytes. Returns the bytes, or None if they are not a usable image."""
+    image_format = sniff_image_format(content)
+    if image_format is not None:
+        if not check_image_complete(content, image_format):
+            print(f"Image validation failed: {img_url}, the {image_format} data is truncated")
+            return None
+        return content
+
+    # Unknown signature: let PIL identify it from the header, without a full decode
+    from PIL import Image, UnidentifiedImageError
+    try:
+        Image.open(BytesIO(content))
+    except (UnidentifiedImageError, OSError) as e:
+        print(f"Failed to identify image at URL: {img_url}, error: {e}")
+        return None
+    return content
+
+def transcode_page(content, policy, quality):
+    """Re-encode one page according to the transcoding policy. Runs in the transcoding process pool."""
+    from PIL import Image
+    img = Image.open(BytesIO(content))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    encoded = BytesIO()
+    if policy == "webp":
+        img.save(encoded, "WEBP", quality=quality)
     else:
-        print(f"Failed to switch to server {server_number}")
-
-def download_image_convert(img_url, save_dir, save_name):
-    save_path = os.path.join(save_dir, save_name)
+        img.save(encoded, "JPEG", quality=quality)
+    return encoded.getvalue()
+
+transcode_pool = None
+transcode_pool_lock = threading.Lock()
+
+def get_transcode_pool():
+    """Return the shared transcoding process pool, creating it on first use (possibly from several chapters at once)."""
+    global transcode_pool
+    with transcode_pool_lock:
+        if transcode_pool is None:
+            transcode_pool = ProcessPoolExecutor(max_workers=transcode_workers)
+            atexit.register(transcode_pool.shutdown)
+    return transcode_pool
+
+def submit_transcode(content):
+    """
+    Hand a page to the transcoding stage and return a Future with the bytes to archive.
+    Pages already in the target format (or everything, with the "original" policy) skip the pool.
+    """
+    if transcode_policy == "original" or sniff_image_format(content) == transcode_policy:
+        return finished_future(content)
+    future = get_transcode_pool().submit(transcode_page, content, transcode_policy, transcode_quality)
+
+    # Timed from submission, so the stage includes waiting for a free worker; the callback runs on the
+    # pool's management thread, hence the series is taken now
+    started = time.perf_counter()
+    series = current_series.get()
+    future.add_done_callback(lambda _: run_metrics.observe("transcode", time.perf_counter() - started, series=series))
+    return future
+
+def finished_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+def transcoded_result(future, img_url):
+    if future is None:
+        return None
     try:
-        img_response = requests.get(img_url, headers=headers, stream=True, timeout=10)
-        img_response.raise_for_status()  # Ensure the request was successful
+        return future.result()
+    except Exception as e:
+        print(f"Failed to transcode image {img_url}: {e}")
+        return None
+
+def page_file_name(page_number, content):
+    """Name a page inside the CBZ, e.g. 001.jpg, using the extension of its actual format."""
+    extensions = {"jpeg": "jpg", "png": "png", "webp": "webp", "gif": "gif"}
+    return f"{page_number:03}.{extensions.get(sniff_image_format(content), 'jpg')}"
+
+def write_transcoded_pages(cbz_file, pending_pages, wait_all=False, checkpoint=None):
+    """Write finished transcodes from the front of pending_pages into the archive, keeping page order."""
+    while pending_pages and (wait_all or pending_pages[0][2].done()):
+        page_number, img_url, future = pending_pages.pop(0)
+        content = transcoded_result(future, img_url)
+        if content is not None:
+            cbz_file.add_page(page_file_name(page_number, content), content)
+            if checkpoint is not None:
+                checkpoint.save(page_number - 1, content)
+
+class MirrorHealth:
+    """
+    Rolling latency and failure-rate scores of the image mirrors, loaded from and saved to the library index.
+    A mirror is an image CDN host (host:port), or one of a site's reader image servers (see server_mirror).
+    """
 
-        # Check if the response is an image by inspecting the Content-Type header
-        content_type = img_response.headers.get('Content-Type')
-        if 'image' not in content_type:
-            print(f"URL did not return an image: {img_url}, Content-Type: {content_type}")
-            return False
+    def __init__(self, scores):
+        self.lock = threading.Lock()
+        self.scores = dict(scores)  # mirror -> (latency, failure_rate, samples, updated_at)
+        self.changed = set()
+
+    def record(self, mirror, seconds, ok):
+        with self.lock:
+            latency, failure_rate, samples, _ = self.scores.get(mirror, (seconds, 0.0, 0, 0))
+            # The first pages of a mirror weigh more, so a fresh score is not dominated by its starting value
+            weight = max(mirror_score_weight, 1 / (samples + 1))
+            if ok:
+                latency += weight * (seconds - latency)
+            failure_rate += weight * ((0.0 if ok else 1.0) - failure_rate)
+            self.scores[mirror] = (latency, failure_rate, samples + 1, time.time())
+            self.changed.add(mirror)
+
+    def degraded(self, mirror):
+        """
+        True while the mirror fails at least mirror_failure_threshold of its pages, has been scored on at least
+        mirror_min_samples pages and was used in the last mirror_retry_after seconds.
+        """
+        with self.lock:
+            score = self.scores.get(mirror)
+        return (score is not None and score[1] >= mirror_failure_threshold and score[2] >= mirror_min_samples
+                and time.time() - score[3] < mirror_retry_after)
+
+    def order(self, items, key=lambda item: item):
+        """
+        items sorted healthiest mirror first. Degraded mirrors go last; the others are ordered by expected
+        seconds per good page once all of them have a score, and otherwise keep their given order.
+        """
+        degraded = {item: self.degraded(key(item)) for item in items}
+        with self.lock:
+            costs = {item: self.scores[key(item)][0] / max(1 - self.scores[key(item)][1], 0.05)
+                     for item in items if key(item) in self.scores}
+        scored = len(costs) == len(items)
+        ranked = sorted(enumerate(items), key=lambda pair: (degraded[pair[1]], costs[pair[1]] if scored else pair[0]))
+        return [item for _, item in ranked]
+
+    def save(self, library):
+        """Write the scores that changed in this run to the library index."""
+        with self.lock:
+            changed = {mirror: self.scores[mirror] for mirror in self.changed}
+            self.changed.clear()
+        if changed:
+            library.store_mirror_scores(changed)
+
+mirror_health = None
+mirror_health_lock = threading.Lock()
+
+def get_mirror_health():
+    """Return the mirror scores, loading them from the library index on first use (usually from several page workers at once)."""
+    global mirror_health
+    with mirror_health_lock:
+        if mirror_health is None:
+            mirror_health = MirrorHealth(get_library().mirror_scores())
+        return mirror_health
+
+def save_mirror_health():
+    if mirror_health is not None:
+        mirror_health.save(get_library())
+
+def server_mirror(site_host, server_number):
+    return f"{site_host} server {server_number}"
+
+def mirror_degraded(image_urls):
+    """True when the CDN host of a chapter's pages has been failing, so the next reader server should be tried first."""
+    return get_mirror_health().degraded(urlparse(image_urls[0]).netloc)
+
+def download_mirrored_page(img_url, mirror, progress=None, alternate_url=None):
+    """
+    Download one page with up to three attempts, giving its CDN host and the reader server (mirror) it
+    came from one score sample for the page. Slow attempts are hedged against alternate_url, the same
+    page on another server, when it is known. Returns the validated bytes, or None.
+    Pages already in the page store are returned before any of that, so they count for neither the hedging
+    deadlines nor the scores.
+    """
+    content = get_page_store().get(img_url)
+    if content is not None:
+        if progress is not None:
+            progress.page_skipped()
+        return content
+
+    health = get_mirror_health()
+    page_started = time.perf_counter()
+    for attempt in range(3):
+        if attempt:
+            run_metrics.count("retries", url=img_url)
+        page = fetch_hedged(download_image_convert, img_url, progress, alternate_url)
+        if page is not None:
+            break
+    elapsed = time.perf_counter() - page_started
+    health.record(urlparse(img_url).netloc, elapsed, page is not None)
+    health.record(mirror, elapsed, page is not None)
+    return page
+
+# Which chapter manifest tier last worked for each site host: "http" or "browser", and how many chapters
+# each host pinned to the browser has resolved there since plain HTTP was last tried
+host_manifest_tiers = {}
+host_browser_chapters = {}
 
-        # Try opening the image to check if it's valid
+def resolve_chapter_images(chapter_url, server_number=1, driver=None):
+    """
+    Resolve the page image URLs of a chapter, cheapest tier first.
+    The "http" tier fetches the chapter page with the shared transport and parses it; the "browser"
+    tier loads it in Chrome and switches image server. Hosts where plain HTTP did not work go
+    straight to the browser on later chapters, until manifest_http_retry_chapters of them have
+    passed and plain HTTP is tried again. Returns (image_urls, tier).
+    """
+    host = urlparse(chapter_url).hostname
+
+    # Server switching needs the reader's buttons, so only server 1 can be resolved over plain HTTP
+    try_http = server_number == 1
+    if try_http and host_manifest_tiers.get(host) == "browser":
+        host_browser_chapters[host] = host_browser_chapters.get(host, 0) + 1
+        try_http = host_browser_chapters[host] > manifest_http_retry_chapters
+        if try_http:
+            host_browser_chapters[host] = 0
+    if try_http:
         try:
-            img = Image.open(BytesIO(img_response.content))
-        except UnidentifiedImageError as e:
-            print(f"Failed to identify image at URL: {img_url}, error: {e}")
-            return False
+            image_urls = chapter_page_image_urls(fetch_chapter_html(chapter_url))
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to fetch chapter page over HTTP: {e}")
+            image_urls = None
 
-        # Convert image to JPG if necessary
-        if img.mode in ("RGBA", "P"):
-            img = img.convert("RGB")
-        img.save(save_path, "JPEG")
-        return True
+        if image_urls:
+            host_manifest_tiers[host] = "http"
+            return image_urls, "http"
+        print(f"No images found over plain HTTP for {chapter_url}. Using the browser.")
 
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to download/convert image: {img_url}, error: {e}")
-        return False
+    image_urls = resolve_chapter_images_with_browser(chapter_url, server_number, driver)
+    if image_urls and server_number == 1:
+        host_manifest_tiers[host] = "browser"
+    return image_urls, "browser"
+
+def resolve_chapter_images_with_browser(chapter_url, server_number, driver=None):
+    if driver is None:
+        with get_browser_pool().browser() as driver:
+            return resolve_chapter_images_with_browser(chapter_url, server_number, driver)
+
+    driver.get(chapter_url)
+    if server_number > 1:
+        switch_server(driver, server_number)
 
-def validate_image(img_path):
     try:
-        img = Image.open(img_path)
-        img.verify()  # Verify if image is valid
-        return True
-    except Exception as e:
-        print(f"Image validation failed: {img_path}, error: {e}")
-        os.remove(img_path)  # Remove corrupt image
-        return False
-total_download_size2 = 0
-def download_chapter_images(chapter_url, manga_title, chapter_title, manga_dir):
+        # Wait for images to appear using WebDriverWait
+        WebDriverWait(driver, browser_wait_timeout).until(
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div.container-chapter-reader img'))
+        )
+    except TimeoutException:
+        print(f"Timed out waiting for images on server {server_number}.")
+        return None
+
+    for attempt in range(3):
+        try:
+            image_elements = driver.find_elements(By.CSS_SELECTOR, 'div.container-chapter-reader img')
+            return [img_elem.get_attribute('src') for img_elem in image_elements]
+        except StaleElementReferenceException:
+            print(f"Stale element reference for image. Retrying image collection.")
+    return None
 
-    global total_download_size2
+def download_chapter_images(chapter_url, manga_title, chapter_title, manga_dir, driver=None):
     """
-    Download chapter images with a fallback mechanism. 
-    If downloading fails from both servers, switch to download_manga2 for recovery.
+    Download chapter images from the reader's image servers, healthiest first according to the mirror scores.
+    A page that fails on one server is fetched from the next server right away, and the server that delivered
+    it is tried first for the rest of the chapter, instead of starting the whole chapter over.
+    The image lists come from resolve_chapter_images, so a browser is only used when plain HTTP is not enough.
+    Returns (the finished CbzWriter, or None if no server produced any pages; the image bytes downloaded).
     """
-    # Initialize Selenium driver
-    driver = init_selenium()
-    driver.get(chapter_url)
+    health = get_mirror_health()
+    site_host = urlparse(chapter_url).hostname
+    servers = health.order([1, 2], key=lambda number: server_mirror(site_host, number))
+    downloaded_bytes = 0
 
-    chapter_images = []
-    download_successful = False
-
-    # Try downloading from both servers (server 1 and server 2)
-    for server_number in range(1, 3):
+    for position, server_number in enumerate(servers):
         print(f"\n Trying server {server_number}...")
-        if server_number > 1:
-            switch_server(driver, server_number)
 
-        try:
-            # Wait for images to appear using WebDriverWait
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div.container-chapter-reader img'))
-            )
+        image_urls, tier = resolve_chapter_images(chapter_url, server_number, driver)
+        if not image_urls:
+            print(f"No images found on server {server_number}. Retrying with the next server.")
+            continue  # Retry with the next server if no images found
 
-            # Find images using Selenium
-            image_elements = driver.find_elements(By.CSS_SELECTOR, 'div.container-chapter-reader img')
-            if not image_elements:
-                print(f"No images found on server {server_number}.")
-                continue  # Retry with the next server if no images found
-
-            # Calculate the total size of all images (for the progress bar)
-            total_size = 0
-            image_sizes = {}  # To track each image's size
-            for img_elem in image_elements:
-                try:
-                    img_url = img_elem.get_attribute('src')
-                    img_head = requests.head(img_url, headers=headers)
-                    if 'Content-Length' in img_head.headers:
-                        img_size = int(img_head.headers['Content-Length'])
-                        image_sizes[img_url] = img_size
-                        total_size += img_size
-                    else:
-                        print(f"Could not get size for image {img_url}")
-                except StaleElementReferenceException:
-                    print(f"Stale element reference for image. Retrying image collection.")
-                    image_elements = driver.find_elements(By.CSS_SELECTOR, 'div.container-chapter-reader img')
-                    img_elem = image_elements[image_elements.index(img_elem)]
-                    img_url = img_elem.get_attribute('src')
-                    img_head = requests.head(img_url, headers=headers)
-                    if 'Content-Length' in img_head.headers:
-                        img_size = int(img_head.headers['Content-Length'])
-                        image_sizes[img_url] = img_size
-                        total_size += img_size
-
-            # Initialize the progress bar
-            progress = tqdm(total=total_size, desc=f"Downloading {chapter_title}", unit="B", unit_scale=True)
-            
-            total_download_size2 += total_size
-
-            # Download images with a progress bar
-            for idx, img_elem in enumerate(image_elements, start=1):
-                retries = 3  # Retry mechanism for each image download
-                while retries > 0:
-                    try:
-                        img_url = img_elem.get_attribute('src')
-                        save_name = f"{idx:03}.jpg"
-                        save_path = os.path.join(manga_dir, save_name)
-
-                        # Download and convert the image to JPG
-                        if download_image_convert(img_url, manga_dir, save_name):
-                            if validate_image(save_path):
-                                chapter_images.append(save_path)
-
-                                # Update the progress bar
-                                if img_url in image_sizes:
-                                    progress.update(image_sizes[img_url])
-                                else:
-                                    # Fallback size if not available
-                                    progress.update(os.path.getsize(save_path))
-                                break  # Exit retry loop if download is successful
-
-                        retries -= 1  # Decrement retry counter if download fails
-
-                    except StaleElementReferenceException:
-                        print(f"Stale element reference for image {idx}. Retrying image download.")
-                        # Re-locate image elements and retry
-                        image_elements = driver.find_elements(By.CSS_SELECTOR, 'div.container-chapter-reader img')
-                        img_elem = image_elements[idx-1]  # Re-fetch the same image element
-                        retries -= 1  # Decrement retry counter
-
-                if retries == 0:
-                    print(f"Failed to download image {idx} after 3 retries. Skipping.")
-
-                # If the first image fails, switch servers immediately
-                if idx == 1 and not os.path.exists(save_path):
-                    print(f"First image failed. Switching server immediately.")
-                    progress.close()
-                    break  # Stop and switch to the next server
+        # [server number, image URLs] in the order pages are tried; the other servers' image lists are only
+        # resolved when a page first needs them
+        mirrors = [[server_number, image_urls]] + [[number, None] for number in servers[position + 1:]]
+        if len(mirrors) > 1 and mirror_degraded(image_urls):
+            print(f"The image host of server {server_number} has been failing. Trying server {mirrors[1][0]} first.")
+            mirrors.append(mirrors.pop(0))
 
-            progress.close()
-            
-            # If images were successfully downloaded, create a CBZ file
-            if chapter_images:
-                create_cbz_file(manga_title, chapter_title, manga_dir, chapter_images)
-                delete_downloaded_images(chapter_images)# Clean up images after CBZ creation
-                download_successful = True  # Mark download as successful
-                break # Exit server loop after successful download
-                return
-            
-        except TimeoutException:  # Handle timeout exception
-            print(f"Timed out waiting for images on server {server_number}. Retrying with the next server.")
+        # Sizes are taken from the image responses as they stream in
+        progress = ChapterProgress(chapter_title, len(image_urls))
 
-    driver.quit()
- 
-def create_cbz_file(manga_title, chapter_title, manga_dir, chapter_images):
-    cbz_name = f"{manga_title} {chapter_title.strip()}.cbz"
-    cbz_path = os.path.join(manga_dir, cbz_name)
+        # Pages are kept in memory and go straight into the chapter archive; pages finished by an
+        # interrupted earlier run are taken from the chapter checkpoint instead of being fetched again
+        cbz_name = f"{manga_title} {chapter_title.strip()}.cbz"
+        cbz_path = os.path.join(manga_dir, cbz_name)
+        checkpoint = ChapterCheckpoint(cbz_path, image_urls)
+        with CbzWriter(cbz_path) as cbz_file:
+            pending_pages = []  # (page number, url, transcode future) waiting to be written in order
+            for idx, img_url in enumerate(image_urls, start=1):
+                page = checkpoint.load(idx - 1)
+                if page is not None:
+                    progress.page_skipped()
+                    pending_pages.append((idx, img_url, finished_future(page)))
+                    continue
 
-    if os.path.exists(cbz_path) and os.path.getsize(cbz_path) == 0:
-        print(f"Removing empty CBZ file: {cbz_path}")
-        os.remove(cbz_path)
+                for mirror in mirrors:
+                    mirror_number, mirror_urls = mirror
+                    if mirror_urls is None:
+                        mirror_urls, _ = resolve_chapter_images(chapter_url, mirror_number, driver)
+                        # Only a server listing the same pages can stand in for single pages
+                        mirror_urls = mirror[1] = mirror_urls if mirror_urls and len(mirror_urls) == len(image_urls) else []
+                    if not mirror_urls:
+                        continue
+
+                    alternate_url = next((other[1][idx - 1] for other in mirrors if other is not mirror and other[1]), None)
+                    page = download_mirrored_page(mirror_urls[idx - 1], server_mirror(site_host, mirror_number), progress, alternate_url)
+                    if page is not None:
+                        img_url = mirror_urls[idx - 1]
+                        if mirror is not mirrors[0]:
+                            print(f"Page {idx} came from server {mirror_number}. Using it first for the rest of the chapter.")
+                            mirrors.remove(mirror)
+                            mirrors.insert(0, mirror)
+                        break
+
+                if page is None:
+                    print(f"Failed to download image {idx} from every server. Skipping.")
+                    run_metrics.count("pages_failed", url=img_url)
+                    progress.page_failed()
+
+                    # A chapter whose first page no server has is given up
+                    if idx == 1:
+                        print(f"First image failed on every server.")
+                        break
+                    continue
 
-    with ZipFile(cbz_path, 'w') as cbz_file:
-        for image in chapter_images:
-            cbz_file.write(image, os.path.basename(image))
-    
-    print(f"CBZ file created: {cbz_path}")
+                # Keep downloading while the transcoding pool encodes this page
+                pending_pages.append((idx, img_url, submit_transcode(page)))
+                write_transcoded_pages(cbz_file, pending_pages, checkpoint=checkpoint)
+
+            write_transcoded_pages(cbz_file, pending_pages, wait_all=True, checkpoint=checkpoint)
+            if cbz_file.page_count == 0:
+                cbz_file.discard()
+        checkpoint.clear()
+
+        progress.close()
+        downloaded_bytes += progress.downloaded
+
+        # If images were successfully downloaded, the CBZ file is complete
+        if cbz_file.page_count:
+            print(f"CBZ file created: {cbz_path}")
+            return cbz_file, downloaded_bytes
+        return None, downloaded_bytes  # Every server has already been tried page by page
+
+    return None, downloaded_bytes
+
+def sniff_image_format(content):
+    """Identify an image from its first bytes. Returns "jpeg", "png", "webp", "gif" or None."""
+    if content[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if content[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "webp"
+    if content[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+class CbzWriter:
+    """
+    Writes a CBZ page by page into '<name>.cbz.part' next to the target and atomically renames it
+    into place once the chapter is complete, so an interrupted run never leaves a half-written .cbz.
+    Already compressed images are stored as-is; anything else is deflated.
+    """
 
-    # Ensure images are deleted after the CBZ file is created
-    delete_downloaded_images(chapter_images)
+    def __init__(self, cbz_path):
+        self.cbz_path = cbz_path
+        self.temp_path = cbz_path + ".part"
+        self.discarded = False
+        self.page_count = 0
+        self.byte_count = 0
+        self.content_hash = hashlib.sha256()
+
+    def __enter__(self):
+        self.file = open(self.temp_path, "wb")
+        self.zip_file = ZipFile(self.file, "w")
+        return self
+
+    def add_page(self, name, content):
+        compress_type = ZIP_STORED if sniff_image_format(content) else ZIP_DEFLATED
+        with run_metrics.stage("cbz_write"):
+            self.zip_file.writestr(name, content, compress_type=compress_type)
+        self.page_count += 1
+        self.byte_count += len(content)
+        self.content_hash.update(content)
+
+    def discard(self):
+        """Drop the archive instead of renaming it into place when the writer closes."""
+        self.discarded = True
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            with run_metrics.stage("cbz_write"):
+                self.zip_file.close()
+                if exc_type is None and not self.discarded:
+                    self.file.flush()
+                    os.fsync(self.file.fileno())
+        finally:
+            self.file.close()
+
+        if exc_type is None and not self.discarded:
+            os.replace(self.temp_path, self.cbz_path)
+        else:
+            os.remove(self.temp_path)
+        return False
 
 def wait_for_cbz_files(manga_dir, timeout=20, interval=5):
     
@@ -515,29 +2042,10 @@ def wait_for_cbz_files(manga_dir, timeout=20, interval=5):
             print(f"Timeout of {timeout} seconds exceeded. Proceeding anyway.")
             break
 
-def delete_downloaded_images(images):
-    for image in images:
-        os.remove(image)
-    print("Chapter images deleted after CBZ creation.")
-
-def close_chrome_like_human():
-    """
-    Simulates human-like behavior to close Chrome by sending the Ctrl+W (or Command+W on macOS) keyboard shortcut.
-    """
-    print("Simulating human-like Chrome closure...")
-    
-    # Adding a delay to mimic human pause before action
-    time.sleep(2)
-
-    # Simulate pressing Ctrl+W to close the active Chrome tab (Command+W for macOS)
-    pyautogui.hotkey('ctrl', 'w')
-
-    print("Chrome tab closed like a human!")
-
 def download_manga_chapter(url, manga_title, chapter_title, manga_dir):
     """
     Downloads a manga chapter. If the browser is closed unexpectedly or fails, it handles the exception and moves to the next chapter.
-    Automatically closes the browser after downloading or skipping the chapter.
+    The browser comes from the shared pool and is returned to it after the chapter.
     """
     print(f"Downloading chapter: {chapter_title}")
 
@@ -547,17 +2055,18 @@ def download_manga_chapter(url, manga_title, chapter_title, manga_dir):
 
     # Skip download if file already exists
     if os.path.exists(cbz_path) and os.path.getsize(cbz_path) > 0:
-        close_chrome_like_human()
         print(f"Chapter {chapter_title} already exists as {cbz_path}. Skipping download.")
         """!!!"""
         return  # Skip the download, no need to initialize the driver
 
-    # Initialize Selenium driver after file check
+    # Check a driver out of the browser pool after file check
+    browser_pool = get_browser_pool()
     driver = None  # Initialize the driver variable
+    fallback_needed = False
 
     try:
-        # Initialize the driver only if the download is needed
-        driver = init_selenium()
+        # Take the driver only if the download is needed
+        driver = browser_pool.acquire()
         driver.get(url)
         download_successful = False
 
@@ -569,12 +2078,12 @@ def download_manga_chapter(url, manga_title, chapter_title, manga_dir):
 
             try:
                 # Wait for the images to load using WebDriverWait
-                WebDriverWait(driver, 10).until(
+                WebDriverWait(driver, browser_wait_timeout).until(
                     EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div.container-chapter-reader img'))
                 )
 
-                # Download chapter images
-                download_chapter_images(url, manga_title, chapter_title, manga_dir)
+                # Download chapter images with the same browser
+                download_chapter_images(url, manga_title, chapter_title, manga_dir, driver)
                 download_successful = True
                 break  # Exit loop if successful download
 
@@ -586,23 +2095,29 @@ def download_manga_chapter(url, manga_title, chapter_title, manga_dir):
                 print(f"WebDriverException: {e}. Browser might have been closed.")
                 break  # Exit server loop and move to next chapter
 
-        if not download_successful:
-            print(f"Both servers failed for chapter {chapter_title}. Switching to download_manga2.")
-            download_manga2(url, manga_title, chapter_title, manga_dir)
+        fallback_needed = not download_successful
 
     except WebDriverException as e:
         print(f"Error occurred: {e}. Moving to next chapter.")  # Handle browser closure/crash
 
     finally:
-        # Ensure driver is properly closed after each chapter
+        # Return the driver to the pool after each chapter; crashed drivers are replaced
         if driver is not None:
-            close_chrome_like_human()
+            browser_pool.release(driver)
+
+    if fallback_needed:
+        print(f"Both servers failed for chapter {chapter_title}. Switching to download_manga2.")
+        download_manga2(url, manga_title, chapter_title)
 
     print(f"Finished downloading chapter {chapter_title}")
 
 def download_manga2(url, manga_title, specific_chapter):
+    """
+    Fallback for a chapter the main path could not finish: download it server by server with download_chapter_images.
+    The chapter is only logged once a CBZ file exists for it. Returns (whether it does, the image bytes downloaded).
+    """
+    run_metrics.count("fallbacks", url=url)
     manga_dir = os.path.join(base_dir, manga_title)
-    log_file_path = os.path.join(manga_dir, "download_log.txt")
 
     # Check if the CBZ file for the specific chapter already exists and is valid
     cbz_name_without_dash = f"{manga_title} {specific_chapter.strip()}.cbz"
@@ -610,67 +2125,53 @@ def download_manga2(url, manga_title, specific_chapter):
 
     if os.path.exists(cbz_path_without_dash) and os.path.getsize(cbz_path_without_dash) > 0:
 
-        log_file_path = os.path.join(manga_dir, "download_log.txt")
-        with open(log_file_path, "a", encoding="utf-8") as log_file:
-            log_file.write(f"{url}\t{specific_chapter}\t{datetime.now().isoformat()}\n")
+        log_chapter(manga_dir, url, specific_chapter, cbz_path=cbz_path_without_dash)
 
         print(f"TRY2 Chapter {specific_chapter} already exists as {cbz_path_without_dash}. Skipping download.")
-        return  # Skip download
-
-    # Iterate over chapters and download only missing ones
-    for chapter_item in url:
-
-        cbz_name_without_dash = f"{manga_title} {specific_chapter.strip()}.cbz"  # File without dash
-        bz_path_without_dash = os.path.join(manga_dir, cbz_name_without_dash)
-
-        if os.path.exists(bz_path_without_dash) and os.path.getsize(bz_path_without_dash) > 0:
-            print(f"This Chapter already exists, EXITING: {specific_chapter} | URL: {url}")
-            return
+        return True, 0  # Skip download
 
-        print(f"Processing fallback chapter: {specific_chapter} | URL: {url}")
-        
-        # Perform the download process for each chapter
-        download_chapter_images(url, manga_title, specific_chapter, manga_dir)
+    print(f"Processing fallback chapter: {specific_chapter} | URL: {url}")
 
+    cbz_file, downloaded_bytes = download_chapter_images(url, manga_title, specific_chapter, manga_dir)
+    if cbz_file is None:
+        print(f"Fallback failed for chapter {specific_chapter}. It is not logged, so the next run tries it again.")
+        return False, downloaded_bytes
 
-        # Log the download in the log file
-        with open(log_file_path, "a", encoding="utf-8") as log_file:
-            log_file.write(f"{url}\t{specific_chapter}\t{datetime.now().isoformat()}\n")
+    # Log the download in the log file and the library index
+    log_chapter(manga_dir, url, specific_chapter, cbz_file)
 
-        print(f"Successfully processed and logged chapter {specific_chapter}. Exiting download_manga2 and continuing with the next chapter.")
-    return
+    print(f"Successfully processed and logged chapter {specific_chapter}. Exiting download_manga2 and continuing with the next chapter.")
+    return True, downloaded_bytes
 
 def update_manga2(chapter_url, manga_title, specific_chapter):
+    """Fallback of the update path; like download_manga2, returns (whether the chapter has a logged CBZ file, bytes downloaded)."""
+    run_metrics.count("fallbacks", url=chapter_url)
 
     manga_dir = os.path.join(base_dir, manga_title)
-    log_file_path = os.path.join(manga_dir, "download_log.txt")
 
     # Check if the CBZ file for the specific chapter already exists and is valid
     cbz_name_without_dash = f"{manga_title} {specific_chapter.strip()}.cbz"
     cbz_path_without_dash = os.path.join(manga_dir, cbz_name_without_dash)
 
     if os.path.exists(cbz_path_without_dash) and os.path.getsize(cbz_path_without_dash) > 0:
+        log_chapter(manga_dir, chapter_url, specific_chapter, cbz_path=cbz_path_without_dash)
         print(f"Chapter {specific_chapter} already exists as {cbz_path_without_dash}. Skipping update.")
-        return  # Skip update
+        return True, 0  # Skip update
 
     print(f"Processing fallback for chapter: {specific_chapter} | URL: {chapter_url}")
 
     try:
         # Attempt to download the chapter images
-        download_chapter_images(chapter_url, manga_title, specific_chapter, manga_dir)
-
-        # Perform the download process for each chapter
-        cbz_name = f"{manga_title} {specific_chapter.strip()}.cbz"
-        cbz_path = os.path.join(manga_dir, cbz_name)
-        if os.path.exists(cbz_path) and os.path.getsize(cbz_path) == 0:
-            return
+        cbz_file, downloaded_bytes = download_chapter_images(chapter_url, manga_title, specific_chapter, manga_dir)
+        if cbz_file is None:
+            print(f"Failed to update chapter {specific_chapter}. It is not logged, so the next update tries it again.")
+            return False, downloaded_bytes
 
-        # Log the update in the log file
-        with open(log_file_path, "a", encoding="utf-8") as log_file:
-            log_file.write(f"{chapter_url}\t{specific_chapter}\t{datetime.now().isoformat()}\n")
+        # Log the update in the log file and the library index
+        log_chapter(manga_dir, chapter_url, specific_chapter, cbz_file)
 
         print(f"Successfully processed and logged chapter {specific_chapter}.")
-        return
+        return True, downloaded_bytes
 
     except Exception as e:
         cbz_name = f"{manga_title} {specific_chapter.strip()}.cbz"
@@ -678,374 +2179,1239 @@ def update_manga2(chapter_url, manga_title, specific_chapter):
 
         # Skip download if file already exists
         if os.path.exists(cbz_path) and os.path.getsize(cbz_path) > 0:
+            log_chapter(manga_dir, chapter_url, specific_chapter, cbz_path=cbz_path)
             print(f"Chapter {specific_chapter} already exists as {cbz_path}. Skipping download.")
-            return
+            return True, 0
             
         else:
             print(f"Failed to update chapter {specific_chapter}: {e}")
             print(f"Falling back to download_manga2 for chapter {specific_chapter}.")
 
             # Call download_manga2 to handle the failure
-            download_manga2(chapter_url, manga_title, specific_chapter)
+            return download_manga2(chapter_url, manga_title, specific_chapter)
+
+
+
+
+
+class ChapterCheckpoint:
+    """
+    Pages of an unfinished chapter, kept in '<name>.cbz.pages' next to the target so that a run which dies
+    mid-chapter only fetches the missing pages next time. A page is stored under its index once it is complete
+    and verified; only transfers cut off halfway are kept as '.download' files, to be continued with Range requests.
+    The checkpoint is dropped when the chapter's image list no longer matches the one it was made for.
+    """
+
+    def __init__(self, cbz_path, image_urls):
+        self.directory = cbz_path + ".pages"
+        manifest_path = os.path.join(self.directory, "manifest.json")
+        if os.path.isdir(self.directory):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+                    same_pages = json.load(manifest_file)["image_urls"] == image_urls
+            except (OSError, ValueError, KeyError):
+                same_pages = False
+            if not same_pages:
+                self.clear()
+
+        if not os.path.exists(manifest_path):
+            os.makedirs(self.directory, exist_ok=True)
+            with open(manifest_path + ".tmp", "w", encoding="utf-8") as manifest_file:
+                json.dump({"image_urls": image_urls}, manifest_file)
+            os.replace(manifest_path + ".tmp", manifest_path)
+
+        restored = sum(1 for name in os.listdir(self.directory) if name.endswith(".page"))
+        if restored:
+            print(f"Resuming chapter: {restored} of {len(image_urls)} pages already downloaded.")
+
+    def page_path(self, index):
+        return os.path.join(self.directory, f"{index:04}.page")
+
+    def partial_path(self, index):
+        return os.path.join(self.directory, f"{index:04}.download")
+
+    def load(self, index):
+        """Bytes of a page finished by an earlier run, or None if it still has to be fetched."""
+        try:
+            with open(self.page_path(index), "rb") as page_file:
+                content = page_file.read()
+        except OSError:
+            return None
+
+        image_format = sniff_image_format(content)
+        if image_format and not check_image_complete(content, image_format):
+            os.remove(self.page_path(index))
+            return None
+        return content
+
+    def save(self, index, content):
+        page_path = self.page_path(index)
+        if os.path.exists(page_path):
             return
+        with open(page_path + ".tmp", "wb") as page_file:
+            page_file.write(content)
+        os.replace(page_path + ".tmp", page_path)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def fetch_page(img_url, progress=None, partial_path=None):
+    """
+    Fetch a single chapter page. Returns the image bytes, or None if it failed.
+    URLs already in the page store are served from it; complete downloads are added to it.
+    """
+    page_store = get_page_store()
+    content = page_store.get(img_url)
+    if content is not None:
+        if progress is not None:
+            progress.page_skipped()
+        return content
+
+    # Hedged copies run side by side, so only an unhedged download continues the checkpoint's partial file
+    started = time.perf_counter()
+    content = fetch_hedged(lambda url, page_progress, cancel: download_page(
+        url, page_progress, partial_path if cancel is None else None, cancel), img_url, progress)
+    elapsed = time.perf_counter() - started
+    run_metrics.observe("image", elapsed, img_url)
+    get_mirror_health().record(urlparse(img_url).netloc, elapsed, content is not None)
+    if content:
+        run_metrics.count("bytes_downloaded", len(content), img_url)
+    else:
+        run_metrics.count("pages_failed", url=img_url)
+    image_format = sniff_image_format(content) if content else None
+    if image_format and check_image_complete(content, image_format):
+        page_store.put(img_url, content)
+    return content
+
+def download_page(img_url, progress=None, partial_path=None, cancel=None):
+    """
+    Download a single chapter page. Returns the image bytes, or None if it failed (or was cancelled).
+    The body is kept in memory; with partial_path, a transfer that gets cut off leaves the bytes it got in
+    that file, and the next attempt continues from where it stopped with a Range request.
+    """
+    received = BytesIO()
+    resume_from = 0
+    try:
+        if partial_path is None:
+            img_response = get_transport().get(img_url, kind="image", stream=True)
+        else:
+            img_response, resume_from = open_resumable(img_url, partial_path)
+
+        with img_response:
+            if img_response.status_code not in (200, 206):
+                if progress is not None:
+                    progress.page_failed()
+                return None
+            read_streamed_content(img_response, progress, received, cancel)
+    except DownloadCancelled:
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to download image {img_url}: {e}")
+        if partial_path is not None and received.tell():
+            with open(partial_path, "ab" if resume_from else "wb") as partial_file:
+                partial_file.write(received.getvalue())
+        if progress is not None:
+            progress.page_failed()
+        return None
+
+    if not resume_from:
+        if partial_path is not None and os.path.exists(partial_path):
+            os.remove(partial_path)
+        return received.getvalue()
+
+    with open(partial_path, "rb") as partial_file:
+        content = partial_file.read(resume_from) + received.getvalue()
+    os.remove(partial_path)
+
+    image_format = sniff_image_format(content)
+    if image_format and not check_image_complete(content, image_format):
+        print(f"Resumed image {img_url} is incomplete. Downloading it again.")
+        return download_page(img_url, progress, partial_path)
+    return content
+
+def fetch_chapter_pages(image_urls, progress=None, max_workers=None, checkpoint=None):
+    """
+    Fetch the pages of a chapter concurrently with a bounded worker pool.
+    Yields (index, content) in reading order as soon as each page and all pages before it
+    are done; content is None for pages that failed. Finished downloads are handed to the
+    transcoding stage right away, so encoding overlaps with the remaining downloads.
+    Closing the generator early (e.g. after the first page failed) cancels the pages that
+    have not started yet. With a checkpoint, pages it already holds are not fetched again
+    and every finished page is saved to it.
+    """
+    max_workers = max_workers or image_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_index = {}
+        completed = {}
+        for index, img_url in enumerate(image_urls):
+            content = checkpoint.load(index) if checkpoint is not None else None
+            if content is not None:
+                if progress is not None:
+                    progress.page_skipped()
+                completed[index] = finished_future(content)
+                continue
+            partial_path = checkpoint.partial_path(index) if checkpoint is not None else None
+            # Each worker runs in a copy of the caller's context so it sends the series' Referer
+            future = executor.submit(contextvars.copy_context().run, fetch_page, img_url, progress, partial_path)
+            future_index[future] = index
+        futures = list(future_index)
+        try:
+            pending = set(futures)
+            next_index = 0
+            while next_index < len(image_urls):
+                if next_index not in completed:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        content = future.result()
+                        completed[future_index[future]] = submit_transcode(content) if content is not None else None
+
+                # Hand out every page that is now contiguous with the ones already yielded
+                while next_index in completed:
+                    content = transcoded_result(completed.pop(next_index), image_urls[next_index])
+                    if checkpoint is not None and content is not None:
+                        checkpoint.save(next_index, content)
+                    yield next_index, content
+                    next_index += 1
+        finally:
+            for future in futures:
+                future.cancel()
+
+def parse_series_page(html_content):
+    """
+    Everything needed from a series page in one parse: title, alternative titles, cover image src and the
+    (href, chapter title) list, in the JSON-friendly form the page cache memoizes.
+    """
+    # Only the info blocks and the chapter list are built into a tree
+    soup = BeautifulSoup(html_content, html_parser, parse_only=SoupStrainer(
+        ['div', 'ul'], class_=['story-info-left', 'story-info-right', 'row-content-chapter']))
+    info_tag = soup.find('div', class_='story-info-right')
+    title_tag = info_tag.find('h1') if info_tag else None
+    title = title_tag.text.strip() if title_tag else None
+
+    alternative_titles = []
+    for label_tag in info_tag.find_all('td', class_='table-label') if info_tag else []:
+        if 'Alternative' in label_tag.text:
+            value_tag = label_tag.find_next_sibling('td', class_='table-value')
+            if value_tag:
+                alternative_titles = [alt_title.strip() for alt_title in value_tag.get_text().split(';') if alt_title.strip()]
+            break
 
+    cover_tag = soup.select_one('div.story-info-left img.img-loading')
+    cover_url = cover_tag.get('src') if cover_tag else None
 
+    chapters = []
+    chapter_list = soup.find('ul', class_='row-content-chapter')
+    for chapter_item in chapter_list.find_all('li', class_='a-h') if chapter_list else []:
+        link = chapter_item.find('a', class_='chapter-name text-nowrap')
+        chapter_title = link.text.strip()
+        chapters.append([link['href'], chapter_title])
+    return {"title": title, "alternative_titles": alternative_titles, "cover_url": cover_url, "chapters": chapters}
 
+def pending_chapter_list(url, chapter_links, existing_log, known_run=None):
+    """
+    Return (chapter_url, chapter_title) for every (href, title) in the list that is not in the download log yet.
+    The list is newest-first, so with known_run set the scan stops after that many downloaded chapters in a row:
+    everything below them is assumed to be downloaded already.
+    """
+    pending_chapters = []
+    known_in_a_row = 0
+    for position, (href, chapter_title) in enumerate(chapter_links):
+        chapter_url = urljoin(url, href)  # Ensure the chapter URL is absolute
 
+        if chapter_url in existing_log:
+            print(f"Chapter {chapter_title} already downloaded. Skipping...")
+            known_in_a_row += 1
+            if known_run and known_in_a_row >= known_run:
+                print(f"Reached {known_in_a_row} downloaded chapters in a row. "
+                      f"Not checking the remaining {len(chapter_links) - position - 1} chapters.")
+                break
+            continue
 
+        known_in_a_row = 0
+        pending_chapters.append((chapter_url, chapter_title))
+    return pending_chapters
+
+def fetch_chapter_html(chapter_url):
+    """Fetch a chapter page through the page cache; retries and fallbacks of the same chapter reuse it."""
+    with run_metrics.stage("chapter_page", chapter_url):
+        return fetch_cached_page(chapter_url)
+
+def chapter_page_image_urls(page):
+    """Reader image URLs of a cached chapter page, parsed once per page body."""
+    return page.parse("image_urls", parse_chapter_image_urls)
+
+def parse_chapter_image_urls(html_content):
+    """Return the reader image URLs of a chapter page, or None if the page has no reader container."""
+    chapter_soup = BeautifulSoup(html_content, html_parser,
+                                 parse_only=SoupStrainer('div', class_='container-chapter-reader'))
+    image_container = chapter_soup.find('div', class_='container-chapter-reader')
+    if not image_container:
+        return None
+
+    image_tags = image_container.find_all('img', class_=['reader-content', 'img-content'])
+    return [img_tag['src'] for img_tag in image_tags]
+
+def chapter_cbz_filename(manga_title, chapter_title):
+    """Build the '<title> Chapter NN.cbz' name from the chapter title, or None if it has no chapter number."""
+    match = re.search(r'Chapter (\d+(\.\d+)?)', chapter_title)
+    if not match:
+        return None
+
+    chapter_number = match.group(1)
+    if '.' in chapter_number:
+        chapter_number = chapter_number.replace('.', 'p')
+    else:
+        chapter_number = f"{int(chapter_number):02}"
+    return f"{manga_title} Chapter {chapter_number}.cbz"
 
-def download_manga(url, manga_title=None):
+def log_chapter(manga_dir, chapter_url, chapter_title, cbz_file=None, cbz_path=None):
+    """Record a finished chapter in the series' download_log.txt and in the library index."""
+    log_file_path = os.path.join(manga_dir, "download_log.txt")
+    with open(log_file_path, "a", encoding="utf-8") as log_file:
+        log_file.write(f"{chapter_url}\t{chapter_title}\t{datetime.now().isoformat()}\n")
+
+    if cbz_file is not None:
+        cbz_path = cbz_file.cbz_path
+    byte_size = os.path.getsize(cbz_path) if cbz_path and os.path.exists(cbz_path) else None
+    get_library().record_chapter(
+        os.path.basename(manga_dir), chapter_url, chapter_title, cbz_path, byte_size,
+        cbz_file.page_count if cbz_file is not None else None,
+        cbz_file.content_hash.hexdigest() if cbz_file is not None else None)
+
+def write_chapter_pages(cbz_path, image_urls, progress=None, checkpoint=None):
+    """
+    Fetch the pages of a chapter and write each one to its CBZ file as soon as it is in order, so no more than
+    the pages still in flight are held in memory. Returns the closed CbzWriter, or None if the first page failed.
+    """
+    with CbzWriter(cbz_path) as cbz_file:
+        for i, content in fetch_chapter_pages(image_urls, progress, checkpoint=checkpoint):
+            if content is None:
+                if i == 0:
+                    cbz_file.discard()
+                    return None
+                print(f"Failed to download image {image_urls[i]}, skipping it.")
+                continue
+            cbz_file.add_page(page_file_name(i + 1, content), content)
+    return cbz_file
+
+def report_throughput(engine_name, chapter_count, total_bytes, elapsed):
+    elapsed = max(elapsed, 1e-6)
+    chapters_per_minute = chapter_count / (elapsed / 60)
+    mb_per_second = total_bytes / (1024 * 1024) / elapsed
+    print(f"{engine_name}: {chapter_count} chapters in {elapsed:.1f}s "
+          f"({chapters_per_minute:.2f} chapters/min, {mb_per_second:.2f} MB/s)")
+
+def series_result(url, manga_title, pending_chapters, outcomes, downloaded_bytes, started, error=None):
+    """
+    What download_manga or update_manga did, as a dict: every chapter it set out to get and whether a CBZ file was
+    written for it (outcomes, by chapter URL, whichever engine or fallback wrote it), the bytes downloaded and the
+    seconds taken. status is "ok", "incomplete" when some of those chapters are still missing, or "failed" (with
+    error) when the series page could not be fetched.
+    """
+    chapters = [{"url": chapter_url, "title": chapter_title, "downloaded": bool(outcomes.get(chapter_url))}
+                for chapter_url, chapter_title in pending_chapters]
+    missing = sum(not chapter["downloaded"] for chapter in chapters)
+    return {
+        "url": url,
+        "title": manga_title,
+        "directory": os.path.join(base_dir, manga_title) if manga_title else None,
+        "status": "failed" if error else "incomplete" if missing else "ok",
+        "error": error,
+        "chapters": chapters,
+        "downloaded": len(chapters) - missing,
+        "missing": missing,
+        "bytes": downloaded_bytes,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+async def pipeline_fetch_stage(chapters, out_queue):
+    """Stage 1: fetch the HTML of each chapter page."""
+    for chapter_url, chapter_title in chapters:
+        try:
+            chapter_page = await asyncio.to_thread(fetch_chapter_html, chapter_url)
+            await out_queue.put((chapter_url, chapter_title, chapter_page, None))
+        except Exception as e:
+            await out_queue.put((chapter_url, chapter_title, None, e))
+    await out_queue.put(None)
+
+async def pipeline_parse_stage(in_queue, out_queue):
+    """Stage 2: parse the chapter HTML into the list of page image URLs."""
+    while True:
+        item = await in_queue.get()
+        if item is None:
+            break
+
+        chapter_url, chapter_title, chapter_page, error = item
+        image_urls = None
+        if error is None:
+            try:
+                image_urls = await asyncio.to_thread(chapter_page_image_urls, chapter_page)
+            except Exception as e:
+                error = e
+        await out_queue.put((chapter_url, chapter_title, image_urls, error))
+    await out_queue.put(None)
+
+async def pipeline_image_stage(in_queue, out_queue, manga_title, manga_dir, overwrite):
+    """
+    Stage 3: fetch the pages of each chapter with the per-chapter worker pool, streaming them into its CBZ file.
+    Passes on the CBZ path (None when the chapter has to go to the fallback path), the finished writer and the
+    image bytes downloaded.
+    Without overwrite, a chapter whose CBZ file is already there is passed on with no writer, to be logged
+    without downloading anything.
+    """
+    while True:
+        item = await in_queue.get()
+        if item is None:
+            break
+
+        chapter_url, chapter_title, image_urls, error = item
+        cbz_path = None
+        cbz_file = None
+        downloaded_bytes = 0
+        if error is None and image_urls:
+            print(f"Found {len(image_urls)} images in chapter: {chapter_title}")
+            cbz_filename = chapter_cbz_filename(manga_title, chapter_title)
+            if not cbz_filename:
+                print(f"Failed to extract chapter number from title '{chapter_title}'. Skipping...")
+                continue
+            cbz_path = os.path.join(manga_dir, cbz_filename)
+            if not overwrite and os.path.exists(cbz_path):
+                print(f"CBZ file already exists for chapter: {chapter_title}. Logging it without downloading.")
+                await out_queue.put((chapter_url, chapter_title, image_urls, cbz_path, None, 0, None))
+                continue
+
+            checkpoint = ChapterCheckpoint(cbz_path, image_urls)
+            progress = ChapterProgress(chapter_title, len(image_urls))
+            try:
+                cbz_file = await asyncio.to_thread(write_chapter_pages, cbz_path, image_urls, progress, checkpoint)
+            except Exception as e:
+                error = e
+            finally:
+                progress.close()
+            downloaded_bytes = progress.downloaded
+            checkpoint.clear()
+            if cbz_file is None:
+                cbz_path = None
+        await out_queue.put((chapter_url, chapter_title, image_urls, cbz_path, cbz_file, downloaded_bytes, error))
+    await out_queue.put(None)
+
+async def pipeline_pack_stage(in_queue, manga_title, manga_dir, fallback, stats):
+    """Stage 4: log each chapter whose CBZ file was written, or hand it to the fallback path."""
+    while True:
+        item = await in_queue.get()
+        if item is None:
+            break
+
+        chapter_url, chapter_title, image_urls, cbz_path, cbz_file, downloaded_bytes, error = item
+        stats["bytes"] += downloaded_bytes
+        if error is None and image_urls is None:
+            print(f"Could not find image container for chapter: {chapter_title}. Skipping...")
+            continue
+        if error is None and not image_urls:
+            print(f"No images found in chapter: {chapter_title}. Skipping...")
+            continue
+
+        if error is not None or cbz_path is None:
+            if error is not None:
+                print(f"Error processing chapter {chapter_title}: {error}")
+            print(f"Switching to alternative method for chapter: {chapter_title}")
+            stats["outcomes"][chapter_url], fallback_bytes = await asyncio.to_thread(fallback, chapter_url, manga_title, chapter_title)
+            stats["chapters"] += 1
+            stats["bytes"] += fallback_bytes
+            continue
+
+        log_chapter(manga_dir, chapter_url, chapter_title, cbz_file, cbz_path)
+        stats["outcomes"][chapter_url] = True
+
+        stats["chapters"] += 1
+        print(f"Successfully processed and logged chapter: {chapter_title}")
+
+async def chapter_pipeline(chapters, manga_title, manga_dir, fallback, overwrite):
+    page_queue = asyncio.Queue(maxsize=pipeline_queue_size)
+    manifest_queue = asyncio.Queue(maxsize=pipeline_queue_size)
+    pack_queue = asyncio.Queue(maxsize=pipeline_queue_size)
+    stats = {"chapters": 0, "bytes": 0, "outcomes": {}}
+
+    await asyncio.gather(
+        pipeline_fetch_stage(chapters, page_queue),
+        pipeline_parse_stage(page_queue, manifest_queue),
+        pipeline_image_stage(manifest_queue, pack_queue, manga_title, manga_dir, overwrite),
+        pipeline_pack_stage(pack_queue, manga_title, manga_dir, fallback, stats),
+    )
+    return stats
+
+def run_chapter_pipeline(chapters, manga_title, manga_dir, fallback, overwrite=True):
+    """
+    Download chapters with the asyncio pipeline engine. Chapter page fetch, manifest parsing,
+    image fetch (streamed into the CBZ file) and logging run as separate stages connected by bounded
+    queues, so the next chapter is already being fetched while the previous one's pages come in.
+    Returns the number of image bytes downloaded and {chapter URL: whether its CBZ file was written}.
+    """
+    start_time = time.time()
+    stats = asyncio.run(chapter_pipeline(chapters, manga_title, manga_dir, fallback, overwrite))
+    report_throughput("Pipeline engine", stats["chapters"], stats["bytes"], time.time() - start_time)
+    return stats["bytes"], stats["outcomes"]
+
+def download_manga(url, manga_title=None, engine=None):
     """
     Main function to download manga chapters. If image download fails, switches to download_manga2 to handle the failed chapter.
+    engine selects "sequential" or "pipeline" processing and defaults to download_engine.
+    Returns what was done as a series_result dict.
     """
-    headers['Referer'] = url
+    set_referer(url)
+    started = time.perf_counter()
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        html_content = response.text
+        series_page = fetch_cached_page(url)
     except requests.exceptions.RequestException as e:
         print(f"Failed to fetch the manga page. Error: {e}")
-        return
+        return series_result(url, sanitize_filename(manga_title) if manga_title else None, [], {}, 0, started, error=str(e))
 
-    soup = BeautifulSoup(html_content, 'html.parser')
+    series = series_page.parse("series_metadata", parse_series_page)
 
     if not manga_title:
-        title_tag = soup.find('div', class_='story-info-right').find('h1')
-        manga_title = title_tag.text.strip()
+        manga_title = series["title"]
 
     print(f"Processing Manga: {manga_title}")
     manga_title = sanitize_filename(manga_title)
+    current_series.set(manga_title)
+    run_metrics.observe("series_page", time.perf_counter() - started, url)
 
     manga_dir = os.path.join(base_dir, manga_title)
     os.makedirs(manga_dir, exist_ok=True)
     
     # Save URL and HTML content if not already saved
     save_url(manga_dir, url)
-    html_file_path = save_html_as_txt(manga_dir, html_content)
+    html_file_path = save_html_as_txt(manga_dir, series_page.text, series_page.changed)
     print(f"HTML content saved to {html_file_path}")
+    save_series_metadata(manga_dir, url, series, series_page.changed)
 
     # Extract and download cover with alternative titles
     alt_site_url = "https://manganelo.com/manga-hero-x-demon-queen"
-    extract_and_download_cover(manga_dir, html_file_path, url, manga_title, alt_site_url)
+    with run_metrics.stage("cover"):
+        extract_and_download_cover(manga_dir, html_file_path, url, manga_title, alt_site_url)
 
     # Process chapters
-    chapter_list = soup.find('ul', class_='row-content-chapter')
-    chapter_links = chapter_list.find_all('li', class_='a-h')
+    chapter_links = series["chapters"]
 
     print(f"Number of chapters found: {len(chapter_links)}")
 
-    log_file_path = os.path.join(manga_dir, "download_log.txt")
-
-    existing_log = {}
-    if os.path.exists(log_file_path):
-        with open(log_file_path, "r", encoding="utf-8") as log_file:
-            for line in log_file:
-                chapter_url, chapter_title, last_updated = line.strip().split("\t")
-                existing_log[chapter_url] = (chapter_title, last_updated)
+    # Chapters already downloaded come from the library index (download_log.txt is imported on first run)
+    library = get_library()
+    library.import_download_log(manga_title, manga_dir)
+    existing_log = library.completed_chapter_urls(manga_title)
 
+    pending_chapters = pending_chapter_list(url, chapter_links, existing_log)
     total_download_size = 0
+    outcomes = {}  # chapter URL -> whether a CBZ file was written and logged
+    start_time = time.time()
 
-    for chapter_item in chapter_links:
-        link = chapter_item.find('a', class_='chapter-name text-nowrap')
-        chapter_url = urljoin(url, link['href'])  # Ensure the chapter URL is absolute
-        chapter_title = link.text.strip()
-
-        if chapter_url in existing_log:
-            print(f"Chapter {chapter_title} already downloaded. Skipping...")
-            continue
+    if (engine or download_engine) == "pipeline":
+        total_download_size, outcomes = run_chapter_pipeline(pending_chapters, manga_title, manga_dir, download_manga2)
+    else:
+        for chapter_url, chapter_title in pending_chapters:
+            print(f"Processing Chapter: {chapter_title} | URL: {chapter_url}")
 
-        print(f"Processing Chapter: {chapter_title} | URL: {chapter_url}")
+            try:
+                image_urls = chapter_page_image_urls(fetch_chapter_html(chapter_url))
 
-        cbz_name_already_exists = f"{manga_title} {chapter_title.strip()}.cbz"
-        if os.path.exists(cbz_name_already_exists) and os.path.getsize(cbz_name_already_exists) > 0:
-            continue
-        
-        
-        try:
-            chapter_response = requests.get(chapter_url, headers=headers)
-            chapter_response.raise_for_status()
-            chapter_soup = BeautifulSoup(chapter_response.text, 'html.parser')
+                if image_urls is None:
+                    print(f"Could not find image container for chapter: {chapter_title}. Skipping...")
+                    continue
 
-            image_container = chapter_soup.find('div', class_='container-chapter-reader')
-            
-            if image_container:
-                image_tags = image_container.find_all('img', class_=['reader-content', 'img-content'])
-                
-                if not image_tags:
+                if not image_urls:
                     print(f"No images found in chapter: {chapter_title}. Skipping...")
                     continue
-                
-                print(f"Found {len(image_tags)} images in chapter: {chapter_title}")
-
-                # Estimate download size
-                chapter_size = 0
-                for img_tag in image_tags:
-                    img_url = img_tag['src']
-                    img_head = requests.head(img_url, headers=headers)
-                    if 'Content-Length' in img_head.headers:
-                        size = int(img_head.headers['Content-Length'])
-                        chapter_size += size
-
-                total_download_size += chapter_size
-
-                print(f"Estimated size for {chapter_title}: {chapter_size / (1024 * 1024):.2f} MB")
-
-                with BytesIO() as img_data:
-                    with ZipFile(img_data, 'w') as cbz_file:
-                        progress = tqdm(total=chapter_size, desc=f"Downloading {chapter_title}", unit="B", unit_scale=True)
-                        for i, img_tag in enumerate(image_tags):
-                            img_url = img_tag['src']
-                            img_response = requests.get(img_url, headers=headers)
-                            if img_response.status_code == 200:
-                                img_name = f"{i+1:03}.jpg"
-                                cbz_file.writestr(img_name, img_response.content)
-                                progress.update(len(img_response.content))
-                            else:
-                                # If the first image fails, switch to download_manga2
-                                if i == 0:
-                                    print(f"Failed to download the first image of {chapter_title}. Switching to alternative method.")
-                                    download_manga2(chapter_url, manga_title, specific_chapter=chapter_title)
-                                    break
-                                else:
-                                    print(f"Failed to download image {img_url}, skipping it.")
-                                    continue
-                        progress.close()
-
-                    # Extract chapter number using regex
-                    match = re.search(r'Chapter (\d+(\.\d+)?)', chapter_title)
-                    if match:
-                        chapter_number = match.group(1)
-                        if '.' in chapter_number:
-                            chapter_number = chapter_number.replace('.', 'p')
+
+                print(f"Found {len(image_urls)} images in chapter: {chapter_title}")
+
+                cbz_filename = chapter_cbz_filename(manga_title, chapter_title)
+                if not cbz_filename:
+                    print(f"Failed to extract chapter number from title '{chapter_title}'. Skipping...")
+                    continue
+                cbz_path = os.path.join(manga_dir, cbz_filename)
+
+                # Pages are streamed into the archive on disk as they arrive, in reading order, and
+                # checkpointed so an interrupted run can pick the chapter up where it stopped
+                first_image_failed = False
+                checkpoint = ChapterCheckpoint(cbz_path, image_urls)
+                with CbzWriter(cbz_path) as cbz_file:
+                    progress = ChapterProgress(chapter_title, len(image_urls))
+                    for i, content in fetch_chapter_pages(image_urls, progress, checkpoint=checkpoint):
+                        if content is not None:
+                            cbz_file.add_page(page_file_name(i + 1, content), content)
                         else:
-                            chapter_number = f"{int(chapter_number):02}"
+                            # If the first image fails, stop here and switch to download_manga2
+                            if i == 0:
+                                first_image_failed = True
+                                cbz_file.discard()
+                                break
+                            else:
+                                print(f"Failed to download image {image_urls[i]}, skipping it.")
+                                continue
+                    progress.close()
+                    total_download_size += progress.downloaded
+                checkpoint.clear()
+
+                if first_image_failed:
+                    print(f"Failed to download the first image of {chapter_title}. Switching to alternative method.")
+                    outcomes[chapter_url], fallback_bytes = download_manga2(chapter_url, manga_title, specific_chapter=chapter_title)
+                    total_download_size += fallback_bytes
+                    continue
 
-                        cbz_filename = f"{manga_title} Chapter {chapter_number}.cbz"
-                        cbz_path = os.path.join(manga_dir, cbz_filename)
+                log_chapter(manga_dir, chapter_url, chapter_title, cbz_file)
+                outcomes[chapter_url] = True
 
-                        with open(cbz_path, 'wb') as file:
-                            file.write(img_data.getvalue())
-                        
-                        with open(log_file_path, "a", encoding="utf-8") as log_file:
-                            log_file.write(f"{chapter_url}\t{chapter_title}\t{datetime.now().isoformat()}\n")
-                    else:
-                        print(f"Failed to extract chapter number from title '{chapter_title}'. Skipping...")
-            else:
-                print(f"Could not find image container for chapter: {chapter_title}. Skipping...")
+            except Exception as e:
+                print(f"Error processing chapter {chapter_title}: {e}")
+                print(f"Switching to alternative method for chapter: {chapter_title}")
+                outcomes[chapter_url], fallback_bytes = download_manga2(chapter_url, manga_title, specific_chapter=chapter_title)
+                total_download_size += fallback_bytes
 
-        except Exception as e:
-            print(f"Error processing chapter {chapter_title}: {e}")
-            print(f"Switching to alternative method for chapter: {chapter_title}")
-            download_manga2(chapter_url, manga_title, specific_chapter=chapter_title)
-    
-    total_download_size_in_mb = (total_download_size + total_download_size2) / (1024 * 1024)
-    print(f"Total estimated download size: {total_download_size_in_mb:.2f} MB")
+        report_throughput("Sequential engine", len(pending_chapters), total_download_size, time.time() - start_time)
+
+    total_download_size_in_mb = total_download_size / (1024 * 1024)
+    print(f"Total download size: {total_download_size_in_mb:.2f} MB")
+    print_transport_stats()
+    save_mirror_health()
     update_combined_log()
+    return series_result(url, manga_title, pending_chapters, outcomes, total_download_size, started)
+
+combined_log_lock = threading.Lock()
+
+def update_combined_log(reconcile=False):
+    """
+    Rewrite combined_download_log.txt from the library index summary instead of re-reading every series' log.
+    With reconcile=True (or the first time the index is used) the library folders are rescanned first to pick up drift.
+    """
+    library = get_library()
+    if reconcile or not library.is_reconciled():
+        library.reconcile(base_dir)
 
-def update_combined_log():
     combined_log_path = os.path.join(base_dir, "combined_download_log.txt")
 
-    with open(combined_log_path, "w", encoding="utf-8") as combined_log:
+    with combined_log_lock, open(combined_log_path, "w", encoding="utf-8") as combined_log:
         combined_log.write(f"{'Manga Title':<30} {'Total Chapters':<15} {'Last Updated':<25}\n")
         combined_log.write("="*70 + "\n")
-        
-        for manga_folder in os.listdir(base_dir):
-            manga_path = os.path.join(base_dir, manga_folder)
-            if os.path.isdir(manga_path):
-                log_file = os.path.join(manga_path, "download_log.txt")
-                
-                if os.path.exists(log_file):
-                    with open(log_file, "r", encoding="utf-8") as individual_log:
-                        chapters = individual_log.readlines()
-                        if chapters:
-                            last_updated = chapters[-1].strip().split("\t")[-1]
-                            combined_log.write(f"{manga_folder:<30} {len(chapters):<15} {last_updated:<25}\n")
-
-def list_manga_folders():
-    manga_folders = [folder for folder in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, folder))]
-    print("Available Manga Titles:")
-    for index, folder in enumerate(manga_folders, 1):
-        print(f"{index}. {folder}")
+
+        for manga_folder, chapter_count, last_updated in library.summary():
+            combined_log.write(f"{manga_folder:<30} {chapter_count:<15} {last_updated:<25}\n")
+
+def list_manga_folders(show=True):
+    with os.scandir(base_dir) as entries:
+        manga_folders = [entry.name for entry in entries if entry.is_dir()]
+    if show:
+        print("Available Manga Titles:")
+        for index, folder in enumerate(manga_folders, 1):
+            print(f"{index}. {folder}")
     return manga_folders
 
-def select_and_update_folders():
-    manga_folders = list_manga_folders()
-    print("Enter 'all' to update all folders.")
-    selected_numbers = input("Enter the numbers of the manga folders to update (comma-separated): ").split(',')
-    
-    if 'all' in selected_numbers:
-        selected_numbers = range(1, len(manga_folders) + 1)
-    else:
-        selected_numbers = [int(num.strip()) for num in selected_numbers]
-
-    for num in selected_numbers:
-        if 1 <= num <= len(manga_folders):
-            manga_folder = manga_folders[num-1]
-            manga_folder_path = os.path.join(base_dir, manga_folder)
-            url_file_path = os.path.join(manga_folder_path, "url.txt")
-
-            if os.path.exists(url_file_path):
-                with open(url_file_path, "r", encoding="utf-8") as url_file:
-                    manga_page_url = url_file.read().strip()
-                print(f"Updating folder: {manga_folder}")
-                update_manga(manga_page_url, manga_title=manga_folder)
-            else:
-                print(f"URL file missing for folder '{manga_folder}'. Please enter the URL.")
-                new_url = input(f"Enter the URL for '{manga_folder}': ").strip()
-                save_url(manga_folder_path, new_url)
-                update_manga(new_url, manga_title=manga_folder)
+def update_series(manga_folders, workers=None, full_scan=False):
+    """
+    Refresh many series at once with a pool of series_workers threads; the transport's per-host token buckets
+    and connection caps keep the combined load on each site in check.
+    Folders without a url.txt are not waited on. Returns {"series": series_result dicts of the updated folders,
+    "failed": folders that failed, "missing_urls": folders without a url.txt, for the caller to report or queue}.
+    """
+    workers = workers or series_workers
+    series_jobs = []
+    missing_urls = []
+    for manga_folder in manga_folders:
+        url_file_path = os.path.join(base_dir, manga_folder, "url.txt")
+        if os.path.exists(url_file_path):
+            with open(url_file_path, "r", encoding="utf-8") as url_file:
+                series_jobs.append((manga_folder, url_file.read().strip()))
+        else:
+            print(f"URL file missing for folder '{manga_folder}'. Queued for later.")
+            missing_urls.append(manga_folder)
+
+    # Open the shared transport and indexes up front so the workers don't race to create them
+    get_transport()
+    get_library()
+    get_page_cache()
+    get_page_store()
+
+    results = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for manga_folder, manga_page_url in series_jobs:
+            print(f"Updating folder: {manga_folder}")
+            futures[executor.submit(update_manga, manga_page_url, manga_title=manga_folder, full_scan=full_scan)] = manga_folder
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Failed to update '{futures[future]}': {e}")
+                failed.append(futures[future])
+                continue
+            results.append(result)
+            if result["status"] == "failed":
+                failed.append(futures[future])
+
+    print(f"Updated {len(series_jobs) - len(failed)} of {len(series_jobs)} series.")
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+    if missing_urls:
+        print(f"Missing url.txt: {', '.join(missing_urls)}")
+    return {"series": results, "failed": failed, "missing_urls": missing_urls}
+
+def select_folders(manga_folders, selection):
+    """
+    The folders picked by selection: 'all', the comma-separated numbers typed at the update prompt (1-based, in
+    list_manga_folders order), or a list of such numbers and folder names. Invalid entries are reported and skipped.
+    """
+    if isinstance(selection, str):
+        selection = [entry.strip() for entry in selection.split(',') if entry.strip()]
+    if 'all' in selection:
+        return list(manga_folders)
+
+    selected_folders = []
+    for entry in selection:
+        if str(entry).isdigit() and 1 <= int(entry) <= len(manga_folders):
+            selected_folders.append(manga_folders[int(entry) - 1])
+        elif entry in manga_folders:
+            selected_folders.append(entry)
         else:
-            print(f"Invalid selection: {num}. Skipping...")
+            print(f"Invalid selection: {entry}. Skipping...")
+    return selected_folders
 
-def update_manga(url, manga_title=None):
+def update_folders(selection="all", full_scan=False, urls=None):
+    """
+    Non-interactive update selector: update the library folders picked by selection (see select_folders).
+    urls maps folder names to series URLs, saved as the url.txt of folders that have none yet.
+    Returns the update_series result.
+    """
+    selected_folders = select_folders(list_manga_folders(show=False), selection)
+    for manga_folder, url in (urls or {}).items():
+        if manga_folder in selected_folders and not os.path.exists(os.path.join(base_dir, manga_folder, "url.txt")):
+            save_url(os.path.join(base_dir, manga_folder), url)
+    return update_series(selected_folders, full_scan=full_scan)
+
+def select_and_update_folders(full_scan=False):
+    manga_folders = list_manga_folders()
+    print("Enter 'all' to update all folders.")
+    selection = input("Enter the numbers of the manga folders to update (comma-separated): ")
+    outcome = update_series(select_folders(manga_folders, selection), full_scan=full_scan)
+
+    # The series without a URL were queued; ask for them once the rest of the run is done
+    queued_folders = []
+    for manga_folder in outcome["missing_urls"]:
+        new_url = input(f"Enter the URL for '{manga_folder}' (leave empty to skip): ").strip()
+        if new_url:
+            save_url(os.path.join(base_dir, manga_folder), new_url)
+            queued_folders.append(manga_folder)
+    if queued_folders:
+        queued = update_series(queued_folders, full_scan=full_scan)
+        outcome["series"] += queued["series"]
+        outcome["failed"] += queued["failed"]
+        outcome["missing_urls"] = [manga_folder for manga_folder in outcome["missing_urls"] if manga_folder not in queued_folders]
+    return outcome
+
+def update_manga(url, manga_title=None, engine=None, full_scan=False):
     """
     Main function to download manga chapters. If the first image download fails,
     it switches to update_manga2 to handle the specific chapter.
+    engine selects "sequential" or "pipeline" processing and defaults to download_engine.
+    Only the newest chapters are diffed against the library unless full_scan is set or the last full
+    scan is older than full_scan_interval_days; a full scan also finds chapters inserted further down.
+    Returns what was done as a series_result dict.
     """
-    headers['Referer'] = url
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    html_content = response.text
+    set_referer(url)
+    started = time.perf_counter()
+    try:
+        series_page = fetch_cached_page(url)
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to fetch the manga page. Error: {e}")
+        return series_result(url, sanitize_filename(manga_title) if manga_title else None, [], {}, 0, started, error=str(e))
+    series = series_page.parse("series_metadata", parse_series_page)
 
     if not manga_title:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        title_tag = soup.find('div', class_='story-info-right').find('h1')
-        manga_title = title_tag.text.strip()
+        manga_title = series["title"]
 
     print(f"Updating Manga: {manga_title}")
 
     # Sanitize the manga title
     manga_title = sanitize_filename(manga_title)
+    current_series.set(manga_title)
+    run_metrics.observe("series_page", time.perf_counter() - started, url)
     manga_dir = os.path.join(base_dir, manga_title)
+    if os.path.isdir(manga_dir):
+        save_series_metadata(manga_dir, url, series, series_page.changed)
 
-    soup = BeautifulSoup(html_content, 'html.parser')
-    chapter_list = soup.find('ul', class_='row-content-chapter')
-    chapter_links = chapter_list.find_all('li', class_='a-h')
+    chapter_links = series["chapters"]
 
     print(f"Number of chapters found: {len(chapter_links)}")
 
-    log_file_path = os.path.join(manga_dir, "download_log.txt")
-
-    existing_log = {}
-    if os.path.exists(log_file_path):
-        with open(log_file_path, "r", encoding="utf-8") as log_file:
-            for line in log_file:
-                parts = line.strip().split("\t")
-                if len(parts) == 3:
-                    chapter_url, chapter_title, last_updated = parts
-                    existing_log[chapter_url] = (chapter_title, last_updated)
-                else:
-                    print(f"Skipping invalid log entry: {line.strip()}")
+    # Chapters already downloaded come from the library index (download_log.txt is imported on first run)
+    library = get_library()
+    library.import_download_log(manga_title, manga_dir)
+    existing_log = library.completed_chapter_urls(manga_title)
 
+    full_scan = full_scan or library.needs_full_scan(manga_title, full_scan_interval_days)
+    if full_scan:
+        print("Checking the full chapter list.")
+    pending_chapters = pending_chapter_list(url, chapter_links, existing_log, None if full_scan else known_chapter_run)
     total_download_size = 0
+    outcomes = {}  # chapter URL -> whether a CBZ file was written and logged
+    start_time = time.time()
 
-    for chapter_item in chapter_links:
-        link = chapter_item.find('a', class_='chapter-name text-nowrap')
-        chapter_url = urljoin(url, link['href'])  # Ensure the chapter URL is absolute
-        chapter_title = link.text.strip()
-
-        if chapter_url in existing_log:
-            print(f"Chapter {chapter_title} already downloaded. Skipping...")
-            continue
+    if (engine or download_engine) == "pipeline":
+        total_download_size, outcomes = run_chapter_pipeline(pending_chapters, manga_title, manga_dir, update_manga2, overwrite=False)
+    else:
+        for chapter_url, chapter_title in pending_chapters:
+            print(f"Processing Chapter: {chapter_title} | URL: {chapter_url}")
 
-        print(f"Processing Chapter: {chapter_title} | URL: {chapter_url}")
+            image_urls = chapter_page_image_urls(fetch_chapter_html(chapter_url))
 
-        chapter_response = requests.get(chapter_url, headers=headers)
-        chapter_response.raise_for_status()
-        chapter_soup = BeautifulSoup(chapter_response.text, 'html.parser')
+            if image_urls is None:
+                print(f"Could not find image container for chapter: {chapter_title}. Skipping...")
+                continue
 
-        image_container = chapter_soup.find('div', class_='container-chapter-reader')
+            if not image_urls:
+                print(f"No images found in chapter: {chapter_title}. Skipping...")
+                continue
 
-        if image_container:
-            image_tags = image_container.find_all('img', class_=['reader-content', 'img-content'])
+            print(f"Found {len(image_urls)} images in chapter: {chapter_title}")
 
-            if not image_tags:
-                print(f"No images found in chapter: {chapter_title}. Skipping...")
+            cbz_filename = chapter_cbz_filename(manga_title, chapter_title)
+            if not cbz_filename:
+                print(f"Failed to extract chapter number from title '{chapter_title}'. Skipping...")
                 continue
+            cbz_path = os.path.join(manga_dir, cbz_filename)
 
-            print(f"Found {len(image_tags)} images in chapter: {chapter_title}")
-
-            # Estimate download size
-            chapter_size = 0
-            for img_tag in image_tags:
-                img_url = img_tag['src']
-                img_head = requests.head(img_url, headers=headers)
-                if 'Content-Length' in img_head.headers:
-                    size = int(img_head.headers['Content-Length'])
-                    chapter_size += size
-
-            total_download_size += chapter_size
-
-            print(f"Estimated size for {chapter_title}: {chapter_size / (1024 * 1024):.2f} MB")
-
-            with BytesIO() as img_data:
-                with ZipFile(img_data, 'w') as cbz_file:
-                    progress = tqdm(total=chapter_size, desc=f"Downloading {chapter_title}", unit="B", unit_scale=True)
-
-                    for i, img_tag in enumerate(image_tags):
-                        img_url = img_tag['src']
-                        img_response = requests.get(img_url, headers=headers)
-
-                        # Check if the first image fails and switch to update_manga2
-                        if img_response.status_code != 200 and i == 0:
-                            print(f"\nFailed to download the first image of {chapter_title}. Switching to update_manga2.")
-                            progress.close()
-                            update_manga2(chapter_url, manga_title, chapter_title)  # Pass correct chapter URL
-                            break  # Exit the current function to prevent further execution
-                        
-                        if img_response.status_code == 200:
-                            img_name = f"{i+1:03}.jpg"
-                            cbz_file.writestr(img_name, img_response.content)
-                            progress.update(len(img_response.content))
-                        else:
-                            print(f"Failed to download image {img_url}")
-                    progress.close()
+            if os.path.exists(cbz_path):
+                # Already on disk but missing from the log: just log it
+                log_chapter(manga_dir, chapter_url, chapter_title, cbz_path=cbz_path)
+                outcomes[chapter_url] = True
+                print(f"Chapter {chapter_title} already exists as {cbz_path}. Logged without downloading.")
+                continue
 
-                # Extract chapter number using regex
-                match = re.search(r'Chapter (\d+(\.\d+)?)', chapter_title)
-                if match:
-                    chapter_number = match.group(1)
-                    if '.' in chapter_number:
-                        chapter_number = chapter_number.replace('.', 'p')
+            # Pages are streamed into the archive on disk as they arrive, in reading order, and
+            # checkpointed so an interrupted run can pick the chapter up where it stopped
+            first_image_failed = False
+            checkpoint = ChapterCheckpoint(cbz_path, image_urls)
+            with CbzWriter(cbz_path) as cbz_file:
+                progress = ChapterProgress(chapter_title, len(image_urls))
+
+                for i, content in fetch_chapter_pages(image_urls, progress, checkpoint=checkpoint):
+                    # Check if the first image fails and stop fetching the rest
+                    if content is None and i == 0:
+                        first_image_failed = True
+                        cbz_file.discard()
+                        break
+
+                    if content is not None:
+                        cbz_file.add_page(page_file_name(i + 1, content), content)
                     else:
-                        chapter_number = f"{int(chapter_number):02}"
+                        print(f"Failed to download image {image_urls[i]}")
+                progress.close()
+                total_download_size += progress.downloaded
+            checkpoint.clear()
+
+            if first_image_failed:
+                print(f"\nFailed to download the first image of {chapter_title}. Switching to update_manga2.")
+                outcomes[chapter_url], fallback_bytes = update_manga2(chapter_url, manga_title, chapter_title)  # Pass correct chapter URL
+                total_download_size += fallback_bytes
+                continue
 
-                    cbz_filename = f"{manga_title} Chapter {chapter_number}.cbz"
-                    cbz_path = os.path.join(manga_dir, cbz_filename)
+            # Log the successful download
+            log_chapter(manga_dir, chapter_url, chapter_title, cbz_file)
+            outcomes[chapter_url] = True
 
+            print(f"Successfully processed and logged chapter: {chapter_title}")
 
-                    if not os.path.exists(cbz_path):
-                        with open(cbz_path, 'wb') as file:
-                            file.write(img_data.getvalue())
+            # Continue to the next chapter
+            print(f"Moving to the next chapter after {chapter_title}...\n")
 
-                    # Log the successful download
-                    with open(log_file_path, "a", encoding="utf-8") as log_file:
-                        log_file.write(f"{chapter_url}\t{chapter_title}\t{datetime.now().isoformat()}\n")
+        report_throughput("Sequential engine", len(pending_chapters), total_download_size, time.time() - start_time)
 
-                    print(f"Successfully processed and logged chapter: {chapter_title}")
+    # A full scan only counts once every chapter it found is on disk; otherwise the next update scans again
+    if full_scan and all(outcomes.get(chapter_url) for chapter_url, _ in pending_chapters):
+        library.mark_full_scan(manga_title)
 
-                else:
-                    print(f"Failed to extract chapter number from title '{chapter_title}'. Skipping...")
+    total_download_size_in_mb = total_download_size / (1024 * 1024)
+    print(f"Total download size: {total_download_size_in_mb:.2f} MB")
+    print_transport_stats()
+    save_mirror_health()
+    update_combined_log()
+    return series_result(url, manga_title, pending_chapters, outcomes, total_download_size, started)
 
-            # Continue to the next chapter
-            print(f"Moving to the next chapter after {chapter_title}...\n")
+class JobQueue:
+    """
+    Durable queue of worker jobs (job_queue.db in base_dir), shared by the workers and the enqueue commands.
+    A worker claims a job under a lease and keeps renewing it while the job runs. A job whose lease runs out, because
+    its worker was killed or the machine restarted, is claimed again, and a job is only marked done once it finished,
+    so restarts neither lose nor duplicate work. A job that is already queued or running is not queued a second time.
+    Kinds: "series" downloads a series URL, "update" refreshes a library folder and "chapter" downloads one chapter.
+    """
 
-        else:
-            print(f"Could not find image container for chapter: {chapter_title}. Skipping...")
+    def __init__(self, db_path):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    options TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_token TEXT,
+                    lease_expires REAL,
+                    worker TEXT,
+                    run_after REAL NOT NULL DEFAULT 0,
+                    enqueued_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    seconds REAL,
+                    timings TEXT,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, run_after, id);
+                CREATE UNIQUE INDEX IF NOT EXISTS jobs_pending ON jobs (kind, target, options)
+                    WHERE status IN ('queued', 'running');
+            """)
+
+    def add(self, kind, target, options=None):
+        """Queue a job and return its id, or None if the same job is already queued or running."""
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO jobs (kind, target, options, enqueued_at) VALUES (?, ?, ?, ?)",
+                (kind, target, json.dumps(options or {}, sort_keys=True), datetime.now().isoformat(timespec="seconds")))
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, worker):
+        """
+        Lease the oldest job that is due, or whose previous lease has expired, to worker.
+        Returns the job as a dict (with the lease token needed to renew or settle it), or None if there is nothing to do.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self.lock, self.connection:
+            # A job that keeps taking its worker down with it is given up on instead of being claimed forever
+            self.connection.execute(
+                "UPDATE jobs SET status = 'failed', lease_token = NULL, finished_at = ?, "
+                "error = 'worker stopped while running the job' "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                (datetime.now().isoformat(timespec="seconds"), now, job_max_attempts))
+            # One statement, so two workers can never claim the same job
+            self.connection.execute("""
+                UPDATE jobs SET status = 'running', lease_token = ?, lease_expires = ?, worker = ?,
+                                attempts = attempts + 1, started_at = ?
+                WHERE id = (SELECT id FROM jobs
+                            WHERE (status = 'queued' AND run_after <= ?) OR (status = 'running' AND lease_expires < ?)
+                            ORDER BY id LIMIT 1)""",
+                (token, now + job_lease_seconds, worker, datetime.now().isoformat(timespec="seconds"), now, now))
+            row = self.connection.execute(
+                "SELECT id, kind, target, options, attempts FROM jobs WHERE lease_token = ?", (token,)).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "kind": row[1], "target": row[2], "options": json.loads(row[3]), "attempts": row[4],
+                "lease_token": token}
+
+    def renew(self, job):
+        """Push the job's lease out by job_lease_seconds; False if the lease was lost to another worker."""
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_token = ? AND status = 'running'",
+                (time.time() + job_lease_seconds, job["id"], job["lease_token"]))
+            return cursor.rowcount > 0
+
+    def finish(self, job, seconds, timings):
+        """Mark the job done with its run time and stage timings."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET status = 'done', lease_token = NULL, finished_at = ?, seconds = ?, timings = ?, error = NULL "
+                "WHERE id = ? AND lease_token = ?",
+                (datetime.now().isoformat(timespec="seconds"), seconds, json.dumps(timings), job["id"], job["lease_token"]))
+
+    def fail(self, job, error, seconds, timings):
+        """Queue the job again after job_retry_delay, or mark it failed once it has had job_max_attempts. Returns the new status."""
+        status = "queued" if job["attempts"] < job_max_attempts else "failed"
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, lease_token = NULL, run_after = ?, finished_at = ?, seconds = ?, timings = ?, error = ? "
+                "WHERE id = ? AND lease_token = ?",
+                (status, time.time() + job_retry_delay, datetime.now().isoformat(timespec="seconds"), seconds,
+                 json.dumps(timings), error, job["id"], job["lease_token"]))
+        return status
+
+    def release(self, job):
+        """Put an interrupted job back at its place in the queue without counting the attempt."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET status = 'queued', lease_token = NULL, attempts = attempts - 1, run_after = 0 "
+                "WHERE id = ? AND lease_token = ?", (job["id"], job["lease_token"]))
+
+    def status_counts(self):
+        with self.lock:
+            return dict(self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def recent_jobs(self, limit=20):
+        """The most recently queued jobs, newest first, as dicts."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT id, kind, target, options, status, attempts, seconds, timings, error FROM jobs ORDER BY id DESC LIMIT ?",
+                (limit,)).fetchall()
+        return [{"id": row[0], "kind": row[1], "target": row[2], "options": json.loads(row[3]), "status": row[4],
+                 "attempts": row[5], "seconds": row[6], "timings": json.loads(row[7]) if row[7] else None, "error": row[8]}
+                for row in rows]
+
+job_queue = None
+
+def get_job_queue():
+    """Return the job queue for base_dir, opening it on first use."""
+    global job_queue
+    if job_queue is None:
+        os.makedirs(base_dir, exist_ok=True)
+        job_queue = JobQueue(os.path.join(base_dir, "job_queue.db"))
+    return job_queue
+
+def download_chapter(chapter_url, manga_title, chapter_title):
+    """
+    Download a single chapter into the series' folder and record it, unless the library already has it.
+    Returns a series_result dict for that one chapter; its status is "incomplete" if no server delivered any pages.
+    """
+    started = time.perf_counter()
+    manga_title = sanitize_filename(manga_title)
+    current_series.set(manga_title)
+    set_referer(chapter_url)
+    manga_dir = os.path.join(base_dir, manga_title)
+    os.makedirs(manga_dir, exist_ok=True)
 
-    total_download_size_in_mb = (total_download_size + total_download_size2) / (1024 * 1024)
-    print(f"Total estimated download size: {total_download_size_in_mb:.2f} MB")
-    update_combined_log()
+    if chapter_url in get_library().completed_chapter_urls(manga_title):
+        print(f"{chapter_title} of {manga_title} is already downloaded. Skipping...")
+        return series_result(chapter_url, manga_title, [], {}, 0, started)
 
+    print(f"Processing Chapter: {chapter_title} | URL: {chapter_url}")
+    cbz_file, downloaded_bytes = download_chapter_images(chapter_url, manga_title, chapter_title, manga_dir)
+    save_mirror_health()
+    if cbz_file is None:
+        print(f"No pages of {chapter_title} could be downloaded.")
+    else:
+        log_chapter(manga_dir, chapter_url, chapter_title, cbz_file)
+        update_combined_log()
+    return series_result(chapter_url, manga_title, [(chapter_url, chapter_title)], {chapter_url: cbz_file is not None},
+                         downloaded_bytes, started)
+
+def job_description(job):
+    if job["kind"] == "chapter":
+        return f"chapter '{job['options']['chapter']}' of {job['options']['series']}"
+    if job["kind"] == "update" and job["options"].get("full_scan"):
+        return f"full update {job['target']}"
+    return f"{job['kind']} {job['target']}"
+
+def run_job(job):
+    """
+    Run one queued job in this process, reusing the connections, caches, browsers and transcode workers of earlier jobs.
+    Raises if the series page could not be fetched or, for a chapter job, if the chapter was not downloaded.
+    """
+    options = job["options"]
+    if job["kind"] == "series":
+        result = download_manga(job["target"], engine=options.get("engine"))
+    elif job["kind"] == "update":
+        manga_folder = job["target"]
+        url_file_path = os.path.join(base_dir, manga_folder, "url.txt")
+        if not os.path.exists(url_file_path):
+            raise FileNotFoundError(f"URL file missing for folder '{manga_folder}'")
+        with open(url_file_path, "r", encoding="utf-8") as url_file:
+            result = update_manga(url_file.read().strip(), manga_title=manga_folder, engine=options.get("engine"),
+                                  full_scan=options.get("full_scan", False))
+    elif job["kind"] == "chapter":
+        result = download_chapter(job["target"], options["series"], options["chapter"])
+        if result["missing"]:
+            raise RuntimeError(f"no pages of {options['chapter']} could be downloaded")
+    else:
+        raise ValueError(f"unknown job kind '{job['kind']}'")
+    if result["status"] == "failed":
+        raise RuntimeError(result["error"])
+    return result
+
+def job_timings():
+    """Seconds and count per stage, and the counters, of the current job's run metrics."""
+    summary = run_metrics.summary()
+    return {
+        "stages": {stage: {"count": entry["count"], "seconds": round(entry["seconds"], 3)} for stage, entry in summary["stages"].items()},
+        "counters": {name: entry["count"] for name, entry in summary["counters"].items()},
+    }
+
+def format_timings(timings):
+    return ", ".join(f"{stage} {entry['seconds']:.1f}s/{entry['count']}" for stage, entry in timings["stages"].items())
+
+def keep_lease(queue, job, stop):
+    """Renew the job's lease until stop is set; runs on its own thread next to the job."""
+    while not stop.wait(job_lease_seconds / 3):
+        if not queue.renew(job):
+            print(f"Lost the lease on job {job['id']}; another worker may run it again.")
+            return
 
-user_input = input("Enter the manga page URL or 'update' to select folders for update: ")
+def run_worker(once=False):
+    """
+    Worker mode: run queued jobs one after another until stopped, or with once until the queue is empty.
+    Everything lives in this one process, so the HTTP connections, page caches, browser pool and transcode workers
+    stay warm from one job to the next. Each job gets its own run metrics: its stage timings are printed, kept with
+    the job in the queue and appended to run_metrics.jsonl.
+    """
+    global run_metrics
+    queue = get_job_queue()
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Worker {worker} taking jobs from {os.path.join(base_dir, 'job_queue.db')}. Press Ctrl+C to stop.")
 
-if user_input.lower() == 'update':
-    select_and_update_folders()
-else:
-    download_manga(user_input)
+    finished = 0
+    try:
+        while True:
+            job = queue.claim(worker)
+            if job is None:
+                if once:
+                    break
+                time.sleep(worker_poll_interval)
+                continue
+
+            print(f"\nJob {job['id']}: {job_description(job)} (attempt {job['attempts']})")
+            run_metrics = RunMetrics({"id": job["id"], "kind": job["kind"], "target": job["target"]})
+            stop_renewing = threading.Event()
+            threading.Thread(target=keep_lease, args=(queue, job, stop_renewing), daemon=True).start()
+            started = time.perf_counter()
+            try:
+                result = run_job(job)
+            except KeyboardInterrupt:
+                queue.release(job)
+                print(f"Job {job['id']} interrupted and put back in the queue.")
+                raise
+            except Exception as e:
+                seconds = time.perf_counter() - started
+                status = queue.fail(job, str(e), seconds, job_timings())
+                print(f"Job {job['id']} failed after {seconds:.1f}s: {e}. "
+                      f"{'It will be retried.' if status == 'queued' else 'Giving up on it.'}")
+            else:
+                seconds = time.perf_counter() - started
+                timings = job_timings()
+                queue.finish(job, seconds, timings)
+                finished += 1
+                print(f"Job {job['id']} done in {seconds:.1f}s: {result['downloaded']} chapter(s) downloaded, "
+                      f"{result['missing']} missing ({format_timings(timings) or 'no stages timed'})")
+            finally:
+                stop_renewing.set()
+                save_run_metrics()
+    except KeyboardInterrupt:
+        print("\nWorker stopped.")
+
+    print(f"Worker finished {finished} job(s).")
+
+def update_jobs(manga_folders, full_scan=False):
+    """Update jobs for the given library folders; 'all' stands for every folder."""
+    if "all" in manga_folders:
+        manga_folders = list_manga_folders(show=False)
+    return [("update", manga_folder, {"full_scan": True} if full_scan else {}) for manga_folder in manga_folders]
+
+def read_job_file(path):
+    """
+    Jobs listed in a file, one per line: a series URL, 'update <folder>', 'update full <folder>' (or 'all' for every
+    folder), or 'chapter <chapter URL> | <series title> | <chapter title>'. Blank lines and # comments are skipped.
+    """
+    jobs = []
+    with open(path, "r", encoding="utf-8") as job_file:
+        for line_number, line in enumerate(job_file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            command, _, rest = line.partition(" ")
+            rest = rest.strip()
+            if command.lower() == "update":
+                full_scan = rest.lower().startswith("full ")
+                jobs.extend(update_jobs([rest[5:].strip() if full_scan else rest], full_scan))
+            elif command.lower() == "chapter":
+                fields = [field.strip() for field in rest.split("|")]
+                if len(fields) != 3 or not all(fields):
+                    print(f"{path}, line {line_number}: expected 'chapter <URL> | <series title> | <chapter title>'. Skipping...")
+                    continue
+                jobs.append(("chapter", fields[0], {"series": fields[1], "chapter": fields[2]}))
+            else:
+                jobs.append(("series", line, {}))
+    return jobs
+
+def enqueue_jobs(jobs):
+    queue = get_job_queue()
+    for kind, target, options in jobs:
+        job_id = queue.add(kind, target, options)
+        description = job_description({"kind": kind, "target": target, "options": options})
+        if job_id is None:
+            print(f"Already queued: {description}")
+        else:
+            print(f"Queued job {job_id}: {description}")
+
+def print_jobs(limit):
+    queue = get_job_queue()
+    counts = queue.status_counts()
+    print(", ".join(f"{counts.get(status, 0)} {status}" for status in ("queued", "running", "done", "failed")))
+    for job in queue.recent_jobs(limit):
+        seconds = f"{job['seconds']:.1f}s" if job["seconds"] is not None else "-"
+        print(f"{job['id']:>5}  {job['status']:<8} {seconds:>8}  tries {job['attempts']}  {job_description(job)}")
+        if job["timings"] and job["timings"]["stages"]:
+            print(f"{'':>7}{format_timings(job['timings'])}")
+        if job["error"] and job["status"] != "done":
+            print(f"{'':>7}error: {job['error']}")
+
+def run_command(argv):
+    """Command line entry point: queue jobs, list them, or run a worker."""
+    parser = argparse.ArgumentParser(
+        description="Manga downloader. Without a command it asks for a manga page URL or 'update' interactively.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue = commands.add_parser("enqueue", help="queue series downloads or library updates for the worker")
+    enqueue.add_argument("targets", nargs="*", help="series URLs, or with --update library folders ('all' for every folder)")
+    enqueue.add_argument("--update", action="store_true", help="queue updates of library folders instead of downloads")
+    enqueue.add_argument("--full", action="store_true", help="with --update, recheck every chapter")
+    enqueue.add_argument("--file", help="also queue the jobs listed in this file, one per line: a series URL, "
+                                        "'update <folder>', 'update full <folder>' or 'chapter <URL> | <series title> | <chapter title>'")
+    chapter = commands.add_parser("enqueue-chapter", help="queue the download of a single chapter")
+    chapter.add_argument("url", help="chapter page URL")
+    chapter.add_argument("series", help="series title, which is also its library folder")
+    chapter.add_argument("chapter", help="chapter title, e.g. 'Chapter 12'")
+    worker = commands.add_parser("worker", help="run queued jobs, keeping connections and browsers warm between them")
+    worker.add_argument("--once", action="store_true", help="exit when the queue is empty instead of waiting for more jobs")
+    jobs = commands.add_parser("jobs", help="list the most recent jobs with their timings")
+    jobs.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "enqueue":
+        if not args.targets and not args.file:
+            parser.error("enqueue needs targets or --file")
+        if args.update:
+            queued = update_jobs(args.targets, args.full)
+        else:
+            queued = [("series", url, {}) for url in args.targets]
+        if args.file:
+            queued += read_job_file(args.file)
+        enqueue_jobs(queued)
+    elif args.command == "enqueue-chapter":
+        enqueue_jobs([("chapter", args.url, {"series": args.series, "chapter": args.chapter})])
+    elif args.command == "worker":
+        run_worker(once=args.once)
+    elif args.command == "jobs":
+        print_jobs(args.limit)
+
+
+if __name__ == "__main__":
+    # Worker mode and the job queue commands; with no arguments the script stays interactive
+    if len(sys.argv) > 1:
+        run_command(sys.argv[1:])
+        sys.exit()
+
+    user_input = input("Enter the manga page URL, 'update' (or 'update full' to recheck every chapter) to select folders "
+                       "for update, or 'reconcile' to rescan the library: ")
+
+    if user_input.lower() == 'update':
+        select_and_update_folders()
+    elif user_input.lower() == 'update full':
+        select_and_update_folders(full_scan=True)
+    elif user_input.lower() == 'reconcile':
+        update_combined_log(reconcile=True)
+    else:
+        download_manga(user_input)
 
-print(f"All selected chapters downloaded and saved in their respective directories.")
-print(f"Combined log file updated and saved at {os.path.join(base_dir, 'combined_download_log.txt')}")
+    print(f"All selected chapters downloaded and saved in their respective directories.")
+    print(f"Combined log file updated and saved at {os.path.join(base_dir, 'combined_download_log.txt')}")
+    print(f"Run metrics saved in {save_run_metrics()}")
 
-input("Press Enter to exit...") 
\ No newline at end of file
+    input("Press Enter to exit...")
@@ -0,0 +1,546 @@
+"""
+Offline benchmark of the downloader against a local stand-in for the manga site and its image CDN.
+The stand-in serves manganelo-style series and reader pages, two image servers and the MangaDex cover API
+with configurable latency, bandwidth, error rate, stalled requests and a share of chapters whose server 1 images are broken
+(those go through the server 2 failover of the fallback path). Every scenario runs the real download_manga or
+update_manga in its own process, and the results are written as JSON so runs can be compared across commits.
+
+python benchmark.py [--chapters 12] [--pages 10] [--latency 0.02] [--bandwidth 0] [--error-rate 0]
+                    [--stall-rate 0] [--failover-rate 0.25] [--set host_rate_limit=20] [--output results.json] [--compare old.json]
+"""
+import argparse
+import ast
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urljoin, urlparse
+from urllib.request import Request, urlopen
+
+from bs4 import BeautifulSoup
+from PIL import Image
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+series_title = "Benchmark Series"
+series_slug = "benchmark-series"
+browser_user_agent = "benchmark-stand-in-browser"
+scenario_names = ["download-sequential", "download-pipeline", "update", "fallback"]
+
+
+def make_page_image(target_bytes, seed):
+    """Noise JPEG of roughly target_bytes; noise keeps it from compressing to nothing."""
+    rng = random.Random(seed)
+    side = 256
+    for _ in range(2):
+        img = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+        encoded = io.BytesIO()
+        img.save(encoded, "JPEG", quality=85)
+        side = max(16, int(side * (target_bytes / len(encoded.getvalue())) ** 0.5))
+    return encoded.getvalue()
+
+
+def unique_jpeg(base, label):
+    """Give every page its own bytes (and content hash) by adding a JPEG comment segment after the SOI marker."""
+    comment = label.encode()
+    return base[:2] + b"\xff\xfe" + (len(comment) + 2).to_bytes(2, "big") + comment + base[2:]
+
+
+class StandInSite:
+    """
+    Threaded HTTP server that plays the manga site, its two image servers and the MangaDex cover API.
+    Counts the requests and bytes it serves per kind of resource.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.chapter_count = settings.chapters
+        self.failover_chapters = set()
+        self.base_image = make_page_image(settings.image_kb * 1024, settings.seed)
+        self.random = random.Random(settings.seed)
+        self.lock = threading.Lock()
+        self.reset_counters()
+        # Server 2 images come from their own port, so the downloader sees them as a separate CDN host
+        self.servers = [StandInServer(("127.0.0.1", 0), StandInHandler) for _ in range(2)]
+        for server in self.servers:
+            server.site = self
+        self.url, self.image_url_2 = (f"http://127.0.0.1:{server.server_port}" for server in self.servers)
+
+    def start(self):
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def set_failover(self, rate):
+        """Break the server 1 images of a seeded random share of the chapters."""
+        count = round(rate * self.chapter_count)
+        self.failover_chapters = set(random.Random(self.settings.seed).sample(range(1, self.chapter_count + 1), count))
+
+    def reset_counters(self):
+        with self.lock:
+            self.counters = {"requests": {}, "errors": 0, "not_modified": 0, "bytes": 0, "image_bytes": 0}
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters, requests=dict(self.counters["requests"]))
+
+    def count(self, kind, status, byte_count):
+        with self.lock:
+            self.counters["requests"][kind] = self.counters["requests"].get(kind, 0) + 1
+            self.counters["bytes"] += byte_count
+            if kind == "image":
+                self.counters["image_bytes"] += byte_count
+            if status >= 500:
+                self.counters["errors"] += 1
+            elif status == 304:
+                self.counters["not_modified"] += 1
+
+    def inject_error(self):
+        with self.lock:
+            return self.random.random() < self.settings.error_rate
+
+    def inject_stall(self):
+        with self.lock:
+            return self.random.random() < self.settings.stall_rate
+
+    def series_page(self):
+        chapters = "".join(
+            f'<li class="a-h"><a rel="nofollow" class="chapter-name text-nowrap" href="{self.url}/chapter/{series_slug}/chapter-{n}" '
+            f'title="{series_title} chapter {n}">Chapter {n}</a><span class="chapter-view text-nowrap">{n * 113}</span>'
+            f'<span class="chapter-time text-nowrap">Jan 01,24</span></li>'
+            for n in range(self.chapter_count, 0, -1))
+        return f"""<!DOCTYPE html><html><head><title>{series_title}</title></head><body>
+<div class="header"><ul>{"".join(f'<li><a href="/genre/{i}">Genre {i}</a></li>' for i in range(40))}</ul></div>
+<div class="panel-story-info">
+<div class="story-info-left"><span class="info-image"><img class="img-loading" src="{self.url}/thumb/{series_slug}.jpg" alt="{series_title}"></span></div>
+<div class="story-info-right"><h1>{series_title}</h1><table class="variations-tableInfo"><tbody>
+<tr><td class="table-label">Alternative :</td><td class="table-value"><h2>Stand-in Series ; Benchmark Alt</h2></td></tr>
+<tr><td class="table-label">Status :</td><td class="table-value">Ongoing</td></tr></tbody></table></div></div>
+<div class="panel-story-info-description">{"Description. " * 80}</div>
+<div class="panel-story-chapter-list"><ul class="row-content-chapter">{chapters}</ul></div>
+</body></html>"""
+
+    def reader_page(self, chapter, server_number):
+        images = "".join(
+            f'<img class="reader-content" src="{self.url if server_number == 1 else self.image_url_2}/img{server_number}/{series_slug}/{chapter}/{page}.jpg" alt="{series_title} chapter {chapter} page {page}">'
+            for page in range(1, self.settings.pages + 1))
+        buttons = "".join(
+            f'<a class="server-image-btn" href="{self.url}/chapter/{series_slug}/chapter-{chapter}?server={n}">Server {n}</a>'
+            for n in (1, 2))
+        return f"""<!DOCTYPE html><html><head><title>{series_title} chapter {chapter}</title></head><body>
+<div class="panel-navigation"><div class="server-image">{buttons}</div></div>
+<div class="container-chapter-reader">{images}</div>
+<div class="panel-navigation"><div class="server-image">{buttons}</div></div>
+</body></html>"""
+
+    def image(self, server_number, chapter, page):
+        if server_number == 1 and chapter in self.failover_chapters:
+            return None
+        return unique_jpeg(self.base_image, f"{server_number}/{chapter}/{page}")
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # A scenario process exiting drops its keep-alive connections; that is not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        site = self.server.site
+        time.sleep(site.settings.latency)
+        parsed = urlparse(self.path)
+        parts = parsed.path.strip("/").split("/")
+        browser = self.headers.get("User-Agent") == browser_user_agent
+
+        if parts[0] == "manga":
+            return self.send_html("browser" if browser else "series", site.series_page())
+        if parts[0] == "chapter" and len(parts) == 3:
+            server_number = int(parse_qs(parsed.query).get("server", ["1"])[0])
+            return self.send_html("browser" if browser else "chapter", site.reader_page(int(parts[2].split("-")[-1]), server_number))
+        if parts[0] in ("img1", "img2") and len(parts) == 4:
+            if site.inject_error():
+                return self.send("image", 503, b"busy", "text/plain")
+            if site.inject_stall():
+                time.sleep(site.settings.stall_seconds)
+            content = site.image(int(parts[0][-1]), int(parts[2]), int(parts[3].split(".")[0]))
+            if content is None:
+                return self.send("image", 503, b"server unavailable", "text/plain")
+            return self.send("image", 200, content, "image/jpeg")
+        if parts == ["api", "manga"]:
+            title = parse_qs(parsed.query).get("title", [""])[0]
+            data = []
+            if title == series_title:
+                data = [{"id": series_slug, "relationships": [{"type": "cover_art", "attributes": {"fileName": "cover.jpg"}}]}]
+            return self.send("api", 200, json.dumps({"data": data}).encode(), "application/json")
+        if parts[0] in ("covers", "thumb"):
+            return self.send("cover", 200, site.base_image, "image/jpeg")
+        self.send("other", 404, b"not found", "text/plain")
+
+    def send_html(self, kind, html):
+        body = html.encode()
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            return self.send(kind, 304, b"", None, {"ETag": etag})
+        self.send(kind, 200, body, "text/html; charset=utf-8", {"ETag": etag})
+
+    def send(self, kind, status, body, content_type, extra_headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        # The bandwidth limit applies to each response on its own, like a per-connection cap at the CDN
+        bandwidth = self.server.site.settings.bandwidth * 1024
+        chunk_size = 16 * 1024
+        try:
+            for start in range(0, len(body), chunk_size):
+                chunk = body[start:start + chunk_size]
+                self.wfile.write(chunk)
+                if bandwidth:
+                    time.sleep(len(chunk) / bandwidth)
+        finally:
+            self.server.site.count(kind, status, len(body))
+
+
+class StandInElement:
+    """The part of a Selenium WebElement the downloader uses, backed by a parsed tag."""
+
+    def __init__(self, browser, tag):
+        self.browser = browser
+        self.tag = tag
+        self.generation = browser.generation
+
+    def check_attached(self):
+        if self.generation != self.browser.generation:
+            raise StaleElementReferenceException("The page was reloaded")
+
+    def get_attribute(self, name):
+        self.check_attached()
+        value = self.tag.get(name)
+        if value is not None and name in ("src", "href"):
+            return urljoin(self.browser.current_url, value)
+        return value
+
+    def is_enabled(self):
+        self.check_attached()
+        return True
+
+    def click(self):
+        self.check_attached()
+        if self.tag.get("href"):
+            self.browser.get(urljoin(self.browser.current_url, self.tag["href"]))
+
+
+class StandInBrowser:
+    """
+    Minimal stand-in for a Chrome WebDriver so the browser tier of the fallback path runs without Chrome.
+    Pages are fetched over plain HTTP and parsed, links are followed on click, and scripts report a loaded page.
+    Unlike Chrome it does not load the images of the pages it opens.
+    """
+
+    def __init__(self):
+        self.current_url = "about:blank"
+        self.soup = BeautifulSoup("", "html.parser")
+        self.generation = 0
+        self.window_handles = ["main"]
+        self.switch_to = self
+
+    def get(self, url):
+        self.generation += 1
+        self.current_url = url
+        if url == "about:blank":
+            self.soup = BeautifulSoup("", "html.parser")
+            return
+        with urlopen(Request(url, headers={"User-Agent": browser_user_agent}), timeout=30) as response:
+            self.soup = BeautifulSoup(response.read(), "html.parser")
+
+    def find_elements(self, by, value):
+        if by == By.CLASS_NAME:
+            value = "." + value
+        elif by != By.CSS_SELECTOR:
+            raise ValueError(f"Stand-in browser cannot find elements by {by}")
+        return [StandInElement(self, tag) for tag in self.soup.select(value)]
+
+    def execute_script(self, script, *args):
+        if "readyState" in script:
+            return "complete"
+        if "naturalWidth" in script:
+            return True
+        return None
+
+    def execute_cdp_cmd(self, command, parameters):
+        return {}
+
+    def window(self, handle):
+        pass
+
+    def delete_all_cookies(self):
+        pass
+
+    def close(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+def parse_override(text):
+    name, _, value = text.partition("=")
+    try:
+        return name.strip(), ast.literal_eval(value.strip())
+    except (ValueError, SyntaxError):
+        return name.strip(), value.strip()
+
+
+def peak_rss_mb(who="self"):
+    """Peak resident set size of this process (or of its reaped children) in MB, where the platform reports it."""
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+        return usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    if who != "self":
+        return None
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return getattr(psutil.Process().memory_info(), "peak_wset", 0) / (1024 * 1024) or None
+
+
+def run_phase(args):
+    """Child process: run one download_manga or update_manga call on the stand-in site and write its measurements."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import PythonApplication1 as app
+
+    app.base_dir = args.base_dir
+    app.mangadex_api_url = f"{args.site}/api"
+    app.mangadex_covers_url = f"{args.site}/covers"
+    for name, value in map(parse_override, args.overrides):
+        setattr(app, name, value)
+    if args.browser == "stand-in":
+        app.init_selenium = StandInBrowser
+
+    manga_dir = os.path.join(args.base_dir, app.sanitize_filename(series_title))
+    existing = set(os.listdir(manga_dir)) if os.path.isdir(manga_dir) else set()
+
+    cpu_start = os.times()
+    start_time = time.perf_counter()
+    url = f"{args.site}/manga/{series_slug}"
+    if args.phase == "update":
+        app.update_manga(url, engine=args.engine)
+    else:
+        app.download_manga(url, engine=args.engine)
+    elapsed = time.perf_counter() - start_time
+    if app.transcode_pool is not None:
+        app.transcode_pool.shutdown()  # Reap the transcoding workers so their CPU time is counted
+    cpu_end = os.times()
+
+    new_archives = [name for name in os.listdir(manga_dir) if name.endswith(".cbz") and name not in existing]
+    transport = app.http_transport_stats.summary()
+    metrics = app.run_metrics.summary()
+    result = {
+        "elapsed_seconds": elapsed,
+        "cpu_seconds": sum(cpu_end[:4]) - sum(cpu_start[:4]),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_child_rss_mb": peak_rss_mb("children"),
+        "chapters": len(new_archives),
+        "cbz_bytes": sum(os.path.getsize(os.path.join(manga_dir, name)) for name in new_archives),
+        "client_requests": transport["requests"],
+        "new_connections": transport["connections"],
+        "stages": {stage: {"count": entry["count"], "seconds": entry["seconds"]} for stage, entry in metrics["stages"].items()},
+        "counters": {name: entry["count"] for name, entry in metrics["counters"].items()},
+    }
+    with open(args.result, "w", encoding="utf-8") as result_file:
+        json.dump(result, result_file)
+
+
+def spawn_phase(args, site, work_dir, base_dir, name, phase, engine, overrides=()):
+    """Run a phase in a fresh interpreter, so every scenario starts cold and its RSS and CPU time are its own."""
+    result_path = os.path.join(work_dir, f"{name}.json")
+    command = [sys.executable, os.path.abspath(__file__), "--phase", phase, "--engine", engine, "--site", site.url,
+               "--base-dir", base_dir, "--result", result_path, "--browser", args.browser]
+    for override in list(args.overrides) + list(overrides):
+        command += ["--set", override]
+
+    with open(os.path.join(work_dir, f"{name}.log"), "w", encoding="utf-8") as log_file:
+        subprocess.run(command, stdout=log_file, stderr=subprocess.STDOUT, timeout=args.timeout, check=True,
+                       env=dict(os.environ, PYTHONIOENCODING="utf-8"))
+    with open(result_path, encoding="utf-8") as result_file:
+        return json.load(result_file)
+
+
+def run_scenario(args, site, work_dir, name):
+    base_dir = os.path.join(work_dir, name)
+    os.makedirs(base_dir)
+    site.chapter_count = args.chapters
+    site.set_failover(0)
+
+    if name == "update":
+        # Seed the library with all but the newest chapters, then publish them and measure the update.
+        # The update skips the page cache TTL, as a later run would, so it revalidates the series page.
+        site.chapter_count = max(args.chapters - args.new_chapters, 0)
+        spawn_phase(args, site, work_dir, base_dir, f"{name}-seed", "download", "sequential")
+        site.chapter_count = args.chapters
+        site.reset_counters()
+        measured = spawn_phase(args, site, work_dir, base_dir, name, "update", "sequential", ["page_cache_ttl=0"])
+    else:
+        if name == "fallback":
+            site.set_failover(args.failover_rate)
+        engine = "pipeline" if name == "download-pipeline" else "sequential"
+        site.reset_counters()
+        measured = spawn_phase(args, site, work_dir, base_dir, name, "download", engine)
+
+    counters = site.snapshot()
+    elapsed = max(measured["elapsed_seconds"], 1e-6)
+    measured.update({
+        "chapters_per_minute": measured["chapters"] / (elapsed / 60),
+        "mb_per_second": counters["image_bytes"] / (1024 * 1024) / elapsed,
+        "server_requests": counters["requests"],
+        "server_errors": counters["errors"],
+        "server_not_modified": counters["not_modified"],
+        "server_bytes": counters["bytes"],
+        "failover_chapters": len(site.failover_chapters),
+    })
+    return measured
+
+
+def git_commit():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=directory, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=directory,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def print_results(results, baseline=None):
+    metrics = ["chapters", "elapsed_seconds", "chapters_per_minute", "mb_per_second", "cpu_seconds", "peak_rss_mb", "client_requests"]
+    for name, measured in results["scenarios"].items():
+        print(f"\n{name}")
+        old = (baseline or {}).get("scenarios", {}).get(name, {})
+        for metric in metrics:
+            value = measured.get(metric)
+            line = f"  {metric:<22} {value:>12.2f}" if isinstance(value, (int, float)) else f"  {metric:<22} {'n/a':>12}"
+            if isinstance(old.get(metric), (int, float)) and isinstance(value, (int, float)):
+                change = (value - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+                line += f"   was {old[metric]:>10.2f} ({change:+.1f}%)"
+            print(line)
+        print(f"  server requests        {measured['server_requests']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the manga downloader against a local stand-in site.")
+    parser.add_argument("--scenarios", default=",".join(scenario_names), help="comma-separated: " + ", ".join(scenario_names))
+    parser.add_argument("--chapters", type=int, default=12, help="chapters in the series")
+    parser.add_argument("--new-chapters", type=int, default=3, help="chapters published before the update scenario")
+    parser.add_argument("--pages", type=int, default=10, help="pages per chapter")
+    parser.add_argument("--image-kb", type=int, default=150, help="approximate size of a page image")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added before every response")
+    parser.add_argument("--bandwidth", type=float, default=0, help="KB/s per response, 0 for unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of image requests answered with 503")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="share of image requests that stall before answering")
+    parser.add_argument("--stall-seconds", type=float, default=5.0, help="how long a stalled image request waits")
+    parser.add_argument("--failover-rate", type=float, default=0.25, help="share of chapters with broken server 1 images in the fallback scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--browser", choices=["stand-in", "chrome"], default="stand-in", help="browser used by the fallback path")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="NAME=VALUE",
+                        help="override a downloader setting, e.g. host_rate_limit=20 (repeatable)")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds before a scenario is abandoned")
+    parser.add_argument("--output", help="results file (default: benchmark_results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the downloaded files and per-scenario logs")
+    parser.add_argument("--phase", choices=["download", "update"], help=argparse.SUPPRESS)
+    parser.add_argument("--engine", help=argparse.SUPPRESS)
+    parser.add_argument("--site", help=argparse.SUPPRESS)
+    parser.add_argument("--base-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        run_phase(args)
+        return
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(scenario_names)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    site = StandInSite(args)
+    site.start()
+    work_dir = tempfile.mkdtemp(prefix="manga-benchmark-")
+    commit, dirty = git_commit()
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "settings": {name: getattr(args, name) for name in ("chapters", "new_chapters", "pages", "image_kb", "latency",
+                                                            "bandwidth", "error_rate", "stall_rate", "stall_seconds",
+                                                            "failover_rate", "seed", "browser")},
+        "overrides": dict(map(parse_override, args.overrides)),
+        "scenarios": {},
+    }
+
+    try:
+        for name in scenarios:
+            print(f"Running {name}...")
+            try:
+                results["scenarios"][name] = run_scenario(args, site, work_dir, name)
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+                print(f"Scenario {name} failed: {e}. See {os.path.join(work_dir, name + '.log')}")
+                args.keep = True
+    finally:
+        site.stop()
+        if args.keep:
+            print(f"Scenario files and logs kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results",
+                                         f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump(results, output_file, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+    print_results(results, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
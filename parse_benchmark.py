@@ -0,0 +1,94 @@
+"""
+Micro-benchmark of the series and chapter page parsing.
+Compares the old approach (a full html.parser document per lookup) with parse_series_page and
+parse_chapter_image_urls, which parse each page once and only build the subtrees they need.
+Runs offline on generated pages: python parse_benchmark.py [chapter count] [repeats]
+"""
+import sys
+import timeit
+from bs4 import BeautifulSoup
+
+import PythonApplication1 as app
+
+
+def build_series_page(chapter_count):
+    navigation = "".join(f'<li><a href="/genre/{i}">Genre {i}</a></li>' for i in range(60))
+    chapters = "".join(
+        f'<li class="a-h"><a class="chapter-name text-nowrap" href="/chapter/{i}" title="Chapter {i}">Chapter {i}</a>'
+        f'<span class="chapter-view text-nowrap">{i * 37}</span><span class="chapter-time text-nowrap">Jan 01,2024</span></li>'
+        for i in range(chapter_count, 0, -1))
+    comments = "".join(f'<div class="comment"><p>Comment number {i} with some text.</p></div>' for i in range(200))
+    return f"""<html><head><title>Series</title><script>var x = 1;</script></head><body>
+<div class="header"><ul class="navigation">{navigation}</ul></div>
+<div class="panel-story-info">
+<div class="story-info-left"><span class="info-image"><img class="img-loading" src="/covers/series.jpg"></span></div>
+<div class="story-info-right"><h1>Benchmark Series</h1><table class="variations-tableInfo"><tbody>
+<tr><td class="table-label">Alternative :</td><td class="table-value"><h2>First Alt ; Second Alt ; Third Alt</h2></td></tr>
+<tr><td class="table-label">Status :</td><td class="table-value">Ongoing</td></tr>
+</tbody></table></div></div>
+<div class="panel-story-info-description">{"Description text. " * 200}</div>
+<div class="panel-story-chapter-list"><ul class="row-content-chapter">{chapters}</ul></div>
+<div class="comments">{comments}</div></body></html>"""
+
+
+def build_chapter_page(page_count):
+    images = "".join(f'<img class="reader-content" src="https://cdn.example/img/{i}.jpg" alt="page {i}">' for i in range(page_count))
+    navigation = "".join(f'<option value="/chapter/{i}">Chapter {i}</option>' for i in range(1000))
+    return f"""<html><body><div class="header"><select>{navigation}</select></div>
+<div class="container-chapter-reader">{images}</div>
+<div class="comments">{"<p>Comment</p>" * 300}</div></body></html>"""
+
+
+def legacy_series_lookups(html_content):
+    """What download/update did before: one full parse each for chapters, alternative titles and the cover."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    title = soup.find('div', class_='story-info-right').find('h1').text.strip()
+    chapter_links = soup.find('ul', class_='row-content-chapter').find_all('li', class_='a-h')
+    chapters = [[link.find('a', class_='chapter-name text-nowrap')['href'], link.text.strip()] for link in chapter_links]
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+    label = soup.find('td', class_='table-label')
+    alternative_titles = [t.strip() for t in label.find_next_sibling('td', class_='table-value').find('h2').text.split(';')]
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+    cover_url = soup.select_one('div.panel-story-info div.story-info-left img.img-loading')['src']
+    return title, chapters, alternative_titles, cover_url
+
+
+def legacy_chapter_images(html_content):
+    soup = BeautifulSoup(html_content, 'html.parser')
+    container = soup.find('div', class_='container-chapter-reader')
+    return [img['src'] for img in container.find_all('img', class_=['reader-content', 'img-content'])]
+
+
+def measure(label, function, argument, repeats):
+    seconds = min(timeit.repeat(lambda: function(argument), number=1, repeat=repeats))
+    print(f"{label:<52} {seconds * 1000:8.2f} ms")
+    return seconds
+
+
+def main():
+    chapter_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    series_page = build_series_page(chapter_count)
+    chapter_page = build_chapter_page(60)
+    print(f"Series page: {chapter_count} chapters, {len(series_page) / 1024:.0f} KB; chapter page: 60 images, "
+          f"{len(chapter_page) / 1024:.0f} KB; best of {repeats}\n")
+
+    parsers = ["html.parser"] + (["lxml"] if app.html_parser == "lxml" else [])
+    legacy_series = measure("series page, old (3 full html.parser parses)", legacy_series_lookups, series_page, repeats)
+    for parser in parsers:
+        app.html_parser = parser
+        seconds = measure(f"series page, parse_series_page ({parser})", app.parse_series_page, series_page, repeats)
+        print(f"{'':<52} {legacy_series / seconds:8.1f}x faster")
+
+    print()
+    legacy_chapter = measure("chapter page, old (full html.parser parse)", legacy_chapter_images, chapter_page, repeats)
+    for parser in parsers:
+        app.html_parser = parser
+        seconds = measure(f"chapter page, parse_chapter_image_urls ({parser})", app.parse_chapter_image_urls, chapter_page, repeats)
+        print(f"{'':<52} {legacy_chapter / seconds:8.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()